@@ -20,19 +20,37 @@ def create_app():
     # Configure the app
     app.config.from_object('app.config.Config')
     
+    # Serialize ObjectIds in responses, using orjson when it is installed
+    from app.utils.json_provider import MongoJSONProvider, OrjsonProvider, orjson
+    app.json = OrjsonProvider(app) if orjson is not None else MongoJSONProvider(app)
+    
     # Initialize plugins
     CORS(app)
     bcrypt.init_app(app)
     mail.init_app(app)
     
+    # Reuse authenticated SMTP connections across emails
+    from app.utils.smtp_pool import SMTPPool
+    app.smtp_pool = SMTPPool(mail, app.config['MAIL_POOL_SIZE'], app.config['MAIL_POOL_MAX_MESSAGES'])
+    
     # Initialize MongoDB connection
     mongo_uri = os.getenv('MONGO_URI')
     db_name = os.getenv('DATABASE_NAME')
-    client = MongoClient(mongo_uri)
+    client = MongoClient(mongo_uri, **app.config['MONGO_CLIENT_OPTIONS'])
     db = client[db_name]
     
-    # Make db accessible to the app
+    # Make the client and db accessible to the app (one pooled client per process)
+    app.mongo_client = client
     app.mongo_db = db
+    app.extensions['mongo'] = client
+    
+    # Create the indexes used by the API queries
+    from app.utils.indexes import ensure_indexes
+    ensure_indexes(db, app.logger)
+    
+    # Return JSON for database errors instead of the default HTML 500 page
+    from app.utils.error_handler import register_error_handlers
+    register_error_handlers(app)
     
     with app.app_context():
         # Include routes
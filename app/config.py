@@ -9,6 +9,22 @@ class Config:
     FLASK_APP = os.getenv('FLASK_APP')
     FLASK_ENV = os.getenv('FLASK_ENV')
     
+    # bcrypt cost factor for password hashes (each +1 doubles hashing time)
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    
+    # Seconds a successfully decoded JWT payload is reused for
+    TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 30))
+    
+    # Run emails and other fire-and-forget jobs off the request thread
+    BACKGROUND_JOBS = os.getenv('BACKGROUND_JOBS', 'True') == 'True'
+    
+    # Threads available to background jobs (each SMTP send holds one)
+    BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', 4))
+    
+    # Worker processes for rendering PDF/Excel/CSV reports off the request
+    # thread; 0 renders inline (serverless hosts may not allow child processes)
+    REPORT_PROCESSES = int(os.getenv('REPORT_PROCESSES', 0))
+    
     # Frontend URL
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
     
@@ -20,6 +36,45 @@ class Config:
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', MAIL_USERNAME)
     
+    # Idle SMTP connections kept open for reuse, and sends before one is recycled
+    MAIL_POOL_SIZE = int(os.getenv('MAIL_POOL_SIZE', 5))
+    MAIL_POOL_MAX_MESSAGES = int(os.getenv('MAIL_POOL_MAX_MESSAGES', 100))
+    
     # MongoDB settings
     MONGO_URI = os.getenv('MONGO_URI')
     DATABASE_NAME = os.getenv('DATABASE_NAME')
+    
+    # MongoClient connection pool and wire settings
+    MONGO_CLIENT_OPTIONS = {
+        'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 100)),
+        'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 10)),
+        # Fail fast instead of queueing forever when the pool is exhausted
+        'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000)),
+        'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000)),
+        'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 3000)),
+        'socketTimeoutMS': int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 10000)),
+        # Negotiated with the server; compressors whose libraries are missing are skipped
+        'compressors': os.getenv('MONGO_COMPRESSORS', 'zstd,snappy,zlib'),
+        'retryWrites': True,
+    }
+    
+    # Seconds the admin dashboard statistics are cached for
+    STATS_CACHE_TTL = int(os.getenv('STATS_CACHE_TTL', 60))
+    
+    # Seconds an admin system report's aggregated dataset is cached for
+    REPORT_CACHE_TTL = int(os.getenv('REPORT_CACHE_TTL', 300))
+    
+    # Seconds a generated system report file is reused for the same dataset
+    REPORT_FILE_CACHE_TTL = int(os.getenv('REPORT_FILE_CACHE_TTL', 60))
+    
+    # Seconds per-user transaction counts are cached for
+    COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 30))
+    
+    # Seconds the per-user search suggestions are cached for
+    SUGGESTIONS_CACHE_TTL = int(os.getenv('SUGGESTIONS_CACHE_TTL', 300))
+    
+    # Seconds dashboard, statistics and chart responses are cached for
+    VIEW_CACHE_TTL = int(os.getenv('VIEW_CACHE_TTL', 300))
+    
+    # Seconds rendered chart PNGs are cached for
+    CHART_CACHE_TTL = int(os.getenv('CHART_CACHE_TTL', 3600))
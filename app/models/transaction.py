@@ -6,14 +6,15 @@ class Transaction:
     
     def __init__(self, user_id, amount, type, category_id, category_name=None, 
                  date=None, note=None, created_at=None):
+        now = datetime.utcnow()
         self.user_id = user_id
         self.amount = float(amount)
         self.type = type  # 'income' or 'expense'
         self.category_id = category_id
         self.category_name = category_name
-        self.date = date or datetime.utcnow()
+        self.date = date or now
         self.note = note
-        self.created_at = created_at or datetime.utcnow()
+        self.created_at = created_at or now
     
     def to_dict(self):
         """Convert Transaction object to dictionary."""
@@ -21,6 +21,7 @@ class User:
         """Convert User object to dictionary."""
         return {
             'username': self.username,
+            'username_lower': self.username.lower(),
             'email': self.email,
             'first_name': self.first_name,
             'last_name': self.last_name,
@@ -1,12 +1,122 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
-from app.utils.auth import token_required, admin_required
-from werkzeug.security import generate_password_hash
+from flask import Blueprint, request, jsonify, current_app, send_file, Response, stream_with_context
+from app.utils.auth import token_required, admin_required, forget_user_status
+from app.utils.indexes import CASE_INSENSITIVE
+from app.utils.pagination import apply_keyset, next_cursor
+from app.utils.executor import run_parallel, run_in_process
+from app.utils.validation import to_object_id
+from app.utils.cache import cache, STATS_PREFIX, REPORT_PREFIX, invalidate_user, invalidate_stats
+from app.utils.report_generator import ReportGenerator
 from bson.objectid import ObjectId
+from bson.regex import Regex
 from datetime import datetime
+from io import BytesIO
+from itertools import islice
+from pymongo import ReturnDocument
+import hashlib
 import pymongo
+import re
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
+# Search terms shorter than this (after stripping) are ignored
+MIN_SEARCH_LENGTH = 2
+
+def _ci_prefix(term):
+    """Case-insensitive prefix match, usable with CASE_INSENSITIVE indexes."""
+    # A range bound is collation-aware, unlike $regex, so it can seek the index
+    return {'$gte': term, '$lt': term + '\uffff'}
+
+def _ci_contains(term):
+    """Case-insensitive substring match with the user input escaped."""
+    return Regex(re.escape(term), 'i')
+
+def _with_user_info(transactions, chunk_size=500):
+    """Lazily attach user_info to transactions, one $in lookup per chunk."""
+    transactions = iter(transactions)
+    while True:
+        chunk = list(islice(transactions, chunk_size))
+        if not chunk:
+            return
+        
+        user_map = _user_info_map(transaction['user_id'] for transaction in chunk)
+        for transaction in chunk:
+            transaction['_id'] = str(transaction['_id'])
+            if transaction['user_id'] in user_map:
+                transaction['user_info'] = user_map[transaction['user_id']]
+            yield transaction
+
+def _user_info_stages(user_id_field='$user_id'):
+    """Aggregation stages that join the owning user's username/email as user_info."""
+    # user_id is stored as a string; it is converted inside the $lookup's let
+    # (no extra stage per document), and a malformed id joins nothing instead
+    # of failing the whole aggregation like $toObjectId would
+    return [
+        {'$lookup': {
+            'from': 'users',
+            'let': {'uid': {'$convert': {
+                'input': user_id_field,
+                'to': 'objectId',
+                'onError': None,
+                'onNull': None
+            }}},
+            'pipeline': [
+                {'$match': {'$expr': {'$eq': ['$_id', '$$uid']}}},
+                {'$project': {'_id': 0, 'username': 1, 'email': 1}}
+            ],
+            'as': 'user_info'
+        }},
+        {'$unwind': {'path': '$user_info', 'preserveNullAndEmptyArrays': True}}
+    ]
+
+def _build_txn_query(args, date_from_key, date_to_key):
+    """Build the admin transaction filter from request args (ValueError on bad dates/amounts)."""
+    query = {}
+    get = args.get
+    
+    for field in ('user_id', 'type', 'category_id'):
+        value = get(field)
+        if value:
+            query[field] = value
+    
+    date_from = get(date_from_key)
+    date_to = get(date_to_key)
+    if date_from or date_to:
+        date_range = query.setdefault('date', {})
+        if date_from:
+            date_range['$gte'] = datetime.fromisoformat(date_from)
+        if date_to:
+            date_range['$lte'] = datetime.fromisoformat(date_to)
+    
+    min_amount = get('min_amount')
+    max_amount = get('max_amount')
+    if min_amount or max_amount:
+        amount_range = query.setdefault('amount', {})
+        if min_amount:
+            amount_range['$gte'] = float(min_amount)
+        if max_amount:
+            amount_range['$lte'] = float(max_amount)
+    
+    return query
+
+def _aggregate_list(collection, pipeline):
+    """Run an aggregation and materialize its results (for run_parallel)."""
+    return list(collection.aggregate(pipeline))
+
+def _user_info_map(user_ids):
+    """Fetch username/email for many users with a single $in query."""
+    object_ids = [ObjectId(uid) for uid in set(user_ids) if ObjectId.is_valid(uid)]
+    if not object_ids:
+        return {}
+    
+    users = current_app.mongo_db.users.find(
+        {'_id': {'$in': object_ids}},
+        {'username': 1, 'email': 1}
+    )
+    return {
+        str(user['_id']): {'username': user['username'], 'email': user['email']}
+        for user in users
+    }
+
 @admin_bp.route('/users', methods=['GET'])
 @admin_bp.route('/users/', methods=['GET'])
 @token_required
@@ -14,44 +124,53 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 def get_users(current_user):
     """Get all users (admin only)."""
     # Parse query parameters
-    search = request.args.get('search', '')
+    search = request.args.get('search', '').strip()
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
+    after = request.args.get('after')  # Cursor from a previous page's next_cursor
     
-    # Build query for search
+    # Build query for search: case-insensitive prefix match on each field.
+    # Terms shorter than MIN_SEARCH_LENGTH would match nearly everything.
     query = {}
-    if search:
+    if len(search) >= MIN_SEARCH_LENGTH:
+        prefix = _ci_prefix(search)
         query['$or'] = [
-            {'username': {'$regex': search, '$options': 'i'}},
-            {'email': {'$regex': search, '$options': 'i'}},
-            {'first_name': {'$regex': search, '$options': 'i'}},
-            {'last_name': {'$regex': search, '$options': 'i'}}
+            {'username': prefix},
+            {'email': prefix},
+            {'first_name': prefix},
+            {'last_name': prefix}
         ]
     
     # Count total users
-    total = current_app.mongo_db.users.count_documents(query)
-    
-    # Get users with pagination
-    users = current_app.mongo_db.users.find(query) \
-        .sort('created_at', pymongo.DESCENDING) \
-        .skip((page - 1) * per_page) \
+    total = current_app.mongo_db.users.count_documents(query, collation=CASE_INSENSITIVE)
+    
+    # Get users with pagination: keyset when a cursor is given, page offset otherwise
+    if after:
+        try:
+            page_query = apply_keyset(query, after, 'created_at')
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        skip = 0
+    else:
+        page_query = query
+        skip = (page - 1) * per_page
+    
+    users = current_app.mongo_db.users.find(page_query, {'password': 0}) \
+        .collation(CASE_INSENSITIVE) \
+        .sort([('created_at', pymongo.DESCENDING), ('_id', pymongo.DESCENDING)]) \
+        .skip(skip) \
         .limit(per_page)
     
-    # Prepare response
-    users_list = []
-    for user in users:
-        user['_id'] = str(user['_id'])
-        # Remove password
-        if 'password' in user:
-            del user['password']
-        users_list.append(user)
+    # Prepare response (password is already excluded by the projection)
+    users_list = [{**user, '_id': str(user['_id'])} for user in users]
     
     return jsonify({
         'users': users_list,
         'total': total,
         'page': page,
         'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        'pages': (total + per_page - 1) // per_page,
+        'next_cursor': next_cursor(users_list, 'created_at', per_page)
     }), 200
 
 @admin_bp.route('/users/<user_id>', methods=['GET'])
@@ -60,20 +179,18 @@ def get_users(current_user):
 @admin_required
 def get_user(current_user, user_id):
     """Get a specific user (admin only)."""
-    try:
-        user = current_app.mongo_db.users.find_one({'_id': ObjectId(user_id)})
-    except:
+    user_oid = to_object_id(user_id)
+    if user_oid is None:
         return jsonify({'message': 'Invalid user ID'}), 400
     
+    # Password hash never leaves the database
+    user = current_app.mongo_db.users.find_one({'_id': user_oid}, {'password': 0})
+    
     if not user:
         return jsonify({'message': 'User not found'}), 404
     
     user['_id'] = str(user['_id'])
     
-    # Remove password
-    if 'password' in user:
-        del user['password']
-    
     return jsonify(user), 200
 
 @admin_bp.route('/users/<user_id>/toggle-status', methods=['PUT'])
@@ -82,33 +199,41 @@ def get_user(current_user, user_id):
 @admin_required
 def toggle_user_status(current_user, user_id):
     """Toggle user active status (admin only)."""
-    try:
-        # Check if user exists
-        user = current_app.mongo_db.users.find_one({'_id': ObjectId(user_id)})
-        
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-        
-        # Cannot deactivate own admin account
-        if str(user['_id']) == current_user['sub'] and user.get('role') == 'admin':
-            return jsonify({'message': 'Cannot deactivate your own admin account'}), 400
-        
-        # Toggle is_active status
-        new_status = not user.get('is_active', True)
-        
-        current_app.mongo_db.users.update_one(
-            {'_id': ObjectId(user_id)},
-            {'$set': {'is_active': new_status}}
-        )
-        
-        status_text = "activated" if new_status else "deactivated"
-        
-        return jsonify({
-            'message': f'User {status_text} successfully',
-            'is_active': new_status
-        }), 200
-    except:
+    user_oid = to_object_id(user_id)
+    if user_oid is None:
         return jsonify({'message': 'Invalid user ID'}), 400
+    
+    # Toggle is_active in a single atomic update; an admin may not toggle
+    # their own account, so that case is excluded by the filter itself
+    query = {'_id': user_oid}
+    is_self = str(user_oid) == current_user['sub']
+    if is_self:
+        query['role'] = {'$ne': 'admin'}
+    
+    user = current_app.mongo_db.users.find_one_and_update(
+        query,
+        [{'$set': {'is_active': {'$not': [{'$ifNull': ['$is_active', True]}]}}}],
+        projection={'is_active': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if not user:
+        # The caller's own account exists (token_required checked it), so a
+        # miss on it means the admin guard matched
+        if is_self:
+            return jsonify({'message': 'Cannot deactivate your own admin account'}), 400
+        return jsonify({'message': 'User not found'}), 404
+    
+    new_status = user['is_active']
+    forget_user_status(str(user_oid))
+    invalidate_stats()
+    
+    status_text = "activated" if new_status else "deactivated"
+    
+    return jsonify({
+        'message': f'User {status_text} successfully',
+        'is_active': new_status
+    }), 200
 
 @admin_bp.route('/users/<user_id>', methods=['DELETE'])
 @admin_bp.route('/users/<user_id>/', methods=['DELETE'])
@@ -116,32 +241,33 @@ def toggle_user_status(current_user, user_id):
 @admin_required
 def delete_user(current_user, user_id):
     """Delete a user (admin only)."""
-    try:
-        # Check if user exists
-        user = current_app.mongo_db.users.find_one({'_id': ObjectId(user_id)})
-        
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-        
-        # Cannot delete own admin account
-        if str(user['_id']) == current_user['sub'] and user.get('role') == 'admin':
-            return jsonify({'message': 'Cannot delete your own admin account'}), 400
-        
-        # Delete user's transactions
-        current_app.mongo_db.transactions.delete_many({'user_id': user_id})
-        
-        # Delete user's custom categories
-        current_app.mongo_db.categories.delete_many({
-            'user_id': user_id,
-            'is_default': False
-        })
-        
-        # Delete user
-        current_app.mongo_db.users.delete_one({'_id': ObjectId(user_id)})
-        
-        return jsonify({'message': 'User and all associated data deleted successfully'}), 200
-    except:
+    user_oid = to_object_id(user_id)
+    if user_oid is None:
         return jsonify({'message': 'Invalid user ID'}), 400
+    
+    # Check if user exists
+    user = current_app.mongo_db.users.find_one({'_id': user_oid}, {'role': 1, 'is_active': 1})
+    
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+    
+    # Cannot delete own admin account
+    if str(user_oid) == current_user['sub'] and user.get('role') == 'admin':
+        return jsonify({'message': 'Cannot delete your own admin account'}), 400
+    
+    # Delete user's transactions, custom categories and the user itself.
+    # The three deletes are independent, so issue them concurrently.
+    db = current_app.mongo_db
+    user_id = str(user_oid)
+    run_parallel(
+        (db.transactions.delete_many, {'user_id': user_id}),
+        (db.categories.delete_many, {'user_id': user_id, 'is_default': False}),
+        (db.users.delete_one, {'_id': user_oid})
+    )
+    invalidate_user(user_id)
+    invalidate_stats()
+    
+    return jsonify({'message': 'User and all associated data deleted successfully'}), 200
 
 @admin_bp.route('/transactions', methods=['GET'])
 @admin_bp.route('/transactions/', methods=['GET'])
@@ -150,62 +276,41 @@ def delete_user(current_user, user_id):
 def get_all_transactions(current_user):
     """Get all transactions from all users (admin only)."""
     # Parse query parameters
-    user_id = request.args.get('user_id')
-    type_filter = request.args.get('type')
-    category_id = request.args.get('category_id')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    min_amount = request.args.get('min_amount')
-    max_amount = request.args.get('max_amount')
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
+    after = request.args.get('after')  # Cursor from a previous page's next_cursor
     
     # Build query
-    query = {}
-    
-    if user_id:
-        query['user_id'] = user_id
-    
-    if type_filter:
-        query['type'] = type_filter
-    
-    if category_id:
-        query['category_id'] = category_id
-    
-    if start_date or end_date:
-        query['date'] = {}
-        if start_date:
-            query['date']['$gte'] = datetime.fromisoformat(start_date)
-        if end_date:
-            query['date']['$lte'] = datetime.fromisoformat(end_date)
-    
-    if min_amount or max_amount:
-        query['amount'] = {}
-        if min_amount:
-            query['amount']['$gte'] = float(min_amount)
-        if max_amount:
-            query['amount']['$lte'] = float(max_amount)
-    
-    # Query database with pagination
+    try:
+        query = _build_txn_query(request.args, 'start_date', 'end_date')
+    except ValueError:
+        return jsonify({'message': 'Invalid date or amount filter'}), 400
+    
+    # Keyset pagination when a cursor is given, page offset otherwise
+    if after:
+        try:
+            page_query = apply_keyset(query, after, 'date')
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        skip = 0
+    else:
+        page_query = query
+        skip = (page - 1) * per_page
+    
+    # Query database with pagination, joining user info in the same round-trip
     total = current_app.mongo_db.transactions.count_documents(query)
-    transactions = current_app.mongo_db.transactions.find(query) \
-        .sort('date', pymongo.DESCENDING) \
-        .skip((page - 1) * per_page) \
-        .limit(per_page)
+    pipeline = [
+        {'$match': page_query},
+        {'$sort': {'date': pymongo.DESCENDING, '_id': pymongo.DESCENDING}},
+        {'$skip': skip},
+        {'$limit': per_page},
+        *_user_info_stages()
+    ]
+    transactions = current_app.mongo_db.transactions.aggregate(pipeline)
     
-    # Get user information for each transaction
     transactions_list = []
     for transaction in transactions:
         transaction['_id'] = str(transaction['_id'])
-        
-        # Add user info
-        user = current_app.mongo_db.users.find_one({'_id': ObjectId(transaction['user_id'])})
-        if user:
-            transaction['user_info'] = {
-                'username': user['username'],
-                'email': user['email']
-            }
-        
         transactions_list.append(transaction)
     
     return jsonify({
@@ -213,7 +318,8 @@ def get_all_transactions(current_user):
         'total': total,
         'page': page,
         'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        'pages': (total + per_page - 1) // per_page,
+        'next_cursor': next_cursor(transactions_list, 'date', per_page)
     }), 200
 
 @admin_bp.route('/stats', methods=['GET'])
@@ -222,56 +328,58 @@ def get_all_transactions(current_user):
 @admin_required
 def get_system_stats(current_user):
     """Get system statistics (admin only)."""
+    # Serve the dashboard from cache while it is fresh
+    cache_key = f"{STATS_PREFIX}{current_user['role']}"
+    stats_response = cache.get(cache_key)
+    if stats_response is not None:
+        return jsonify(stats_response), 200
+    
     # Total users
     total_users = current_app.mongo_db.users.count_documents({})
     
-    # Total transactions
-    total_transactions = current_app.mongo_db.transactions.count_documents({})
-    
-    # Total income and expense
+    # Totals, transaction count and top 5 spenders in one round-trip
     pipeline = [
-        {'$group': {
-            '_id': '$type',
-            'total': {'$sum': '$amount'}
+        {'$facet': {
+            'totals': [
+                {'$group': {
+                    '_id': '$type',
+                    'total': {'$sum': '$amount'},
+                    'count': {'$sum': 1}
+                }}
+            ],
+            'high_spenders': [
+                {'$match': {'type': 'expense'}},
+                {'$group': {
+                    '_id': '$user_id',
+                    'total_expense': {'$sum': '$amount'}
+                }},
+                {'$sort': {'total_expense': -1}},
+                {'$limit': 5},
+                *_user_info_stages('$_id'),
+                {'$project': {'_id': 0, 'user_id': '$_id', 'total_expense': 1, 'user_info': 1}}
+            ]
         }}
     ]
     
-    transaction_totals = list(current_app.mongo_db.transactions.aggregate(pipeline))
+    stats = next(current_app.mongo_db.transactions.aggregate(pipeline))
+    transaction_totals = stats['totals']
+    high_spenders = stats['high_spenders']
     
+    total_transactions = sum(item['count'] for item in transaction_totals)
     total_income = next((item['total'] for item in transaction_totals if item['_id'] == 'income'), 0)
     total_expense = next((item['total'] for item in transaction_totals if item['_id'] == 'expense'), 0)
     
-    # Users with high spending (top 5)
-    pipeline = [
-        {'$match': {'type': 'expense'}},
-        {'$group': {
-            '_id': '$user_id',
-            'total_expense': {'$sum': '$amount'}
-        }},
-        {'$sort': {'total_expense': -1}},
-        {'$limit': 5}
-    ]
-    
-    high_spenders = list(current_app.mongo_db.transactions.aggregate(pipeline))
-    
-    # Add user info
-    for spender in high_spenders:
-        user = current_app.mongo_db.users.find_one({'_id': ObjectId(spender['_id'])})
-        if user:
-            spender['user_info'] = {
-                'username': user['username'],
-                'email': user['email']
-            }
-        spender['user_id'] = spender.pop('_id')
-    
-    return jsonify({
+    stats_response = {
         'user_count': total_users,
         'transaction_count': total_transactions,
         'total_income': total_income,
         'total_expense': total_expense,
         'balance': total_income - total_expense,
         'high_spenders': high_spenders
-    }), 200
+    }
+    cache.set(cache_key, stats_response, current_app.config['STATS_CACHE_TTL'])
+    
+    return jsonify(stats_response), 200
 
 @admin_bp.route('/users/<user_id>/statistics', methods=['GET'])
 @admin_bp.route('/users/<user_id>/statistics/', methods=['GET'])
@@ -281,7 +389,7 @@ def get_user_statistics(current_user, user_id):
     """Get detailed statistics for a specific user (admin only)."""
     try:
         # Verify user exists
-        user = current_app.mongo_db.users.find_one({'_id': ObjectId(user_id)})
+        user = current_app.mongo_db.users.find_one({'_id': ObjectId(user_id)}, {'_id': 1})
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
@@ -299,16 +407,9 @@ def get_user_statistics(current_user, user_id):
             if date_to:
                 base_query['date']['$lte'] = datetime.fromisoformat(date_to)
         
-        # Income vs Expense totals
-        income_total = sum(t['amount'] for t in current_app.mongo_db.transactions.find({**base_query, 'type': 'income'}))
-        expense_total = sum(t['amount'] for t in current_app.mongo_db.transactions.find({**base_query, 'type': 'expense'}))
-        
-        # Transaction count
-        total_transactions = current_app.mongo_db.transactions.count_documents(base_query)
-        
-        # Category breakdown (expenses)
-        expense_pipeline = [
-            {'$match': {**base_query, 'type': 'expense'}},
+        # Totals, counts, category breakdowns and the monthly trend in one
+        # scan; each branch filters by type itself, so no per-type query copies
+        category_breakdown = [
             {'$group': {
                 '_id': '$category_name',
                 'total': {'$sum': '$amount'},
@@ -316,34 +417,43 @@ def get_user_statistics(current_user, user_id):
             }},
             {'$sort': {'total': -1}}
         ]
-        expense_by_category = list(current_app.mongo_db.transactions.aggregate(expense_pipeline))
+        facets = next(current_app.mongo_db.transactions.aggregate([
+            {'$match': base_query},
+            {'$facet': {
+                'totals': [
+                    {'$group': {'_id': '$type', 'total': {'$sum': '$amount'}, 'count': {'$sum': 1}}}
+                ],
+                'expense_by_category': [{'$match': {'type': 'expense'}}, *category_breakdown],
+                'income_by_category': [{'$match': {'type': 'income'}}, *category_breakdown],
+                'monthly': [
+                    {'$group': {
+                        '_id': {
+                            'year': {'$year': '$date'},
+                            'month': {'$month': '$date'},
+                            'type': '$type'
+                        },
+                        'total': {'$sum': '$amount'}
+                    }},
+                    {'$sort': {'_id.year': 1, '_id.month': 1}}
+                ]
+            }}
+        ], allowDiskUse=True))
         
-        # Category breakdown (income)
-        income_pipeline = [
-            {'$match': {**base_query, 'type': 'income'}},
-            {'$group': {
-                '_id': '$category_name',
-                'total': {'$sum': '$amount'},
-                'count': {'$sum': 1}
-            }},
-            {'$sort': {'total': -1}}
-        ]
-        income_by_category = list(current_app.mongo_db.transactions.aggregate(income_pipeline))
+        # Income vs Expense totals and counts
+        totals = {'income': 0, 'expense': 0}
+        counts = {'income': 0, 'expense': 0}
+        for item in facets['totals']:
+            totals[item['_id']] = item['total']
+            counts[item['_id']] = item['count']
+        income_total = totals['income']
+        expense_total = totals['expense']
         
-        # Monthly trend
-        monthly_pipeline = [
-            {'$match': base_query},
-            {'$group': {
-                '_id': {
-                    'year': {'$year': '$date'},
-                    'month': {'$month': '$date'},
-                    'type': '$type'
-                },
-                'total': {'$sum': '$amount'}
-            }},
-            {'$sort': {'_id.year': 1, '_id.month': 1}}
-        ]
-        monthly_data = list(current_app.mongo_db.transactions.aggregate(monthly_pipeline))
+        # Transaction count
+        total_transactions = sum(item['count'] for item in facets['totals'])
+        
+        expense_by_category = facets['expense_by_category']
+        income_by_category = facets['income_by_category']
+        monthly_data = facets['monthly']
         
         # Organize monthly data
         monthly_trends = {}
@@ -364,8 +474,8 @@ def get_user_statistics(current_user, user_id):
             })
         
         # Average transaction amounts
-        avg_income = income_total / max(1, len(list(current_app.mongo_db.transactions.find({**base_query, 'type': 'income'}))))
-        avg_expense = expense_total / max(1, len(list(current_app.mongo_db.transactions.find({**base_query, 'type': 'expense'}))))
+        avg_income = income_total / max(1, counts['income'])
+        avg_expense = expense_total / max(1, counts['expense'])
         
         return jsonify({
             'summary': {
@@ -384,14 +494,161 @@ def get_user_statistics(current_user, user_id):
     except Exception as e:
         return jsonify({'message': f'Invalid user ID: {str(e)}'}), 400
 
+def _system_report_data(date_query, report_type, period):
+    """Aggregate the dataset behind a system report, independent of export format."""
+    db = current_app.mongo_db
+    match_stage = {'$match': date_query} if date_query else {'$match': {}}
+    
+    # Total users
+    user_counts_pipeline = [
+        {'$facet': {
+            'total': [{'$count': 'n'}],
+            'active': [{'$match': {'is_active': True}}, {'$count': 'n'}]
+        }}
+    ]
+    
+    # Transaction totals
+    transaction_pipeline = [
+        match_stage,
+        {'$group': {
+            '_id': '$type',
+            'total': {'$sum': '$amount'},
+            'count': {'$sum': 1}
+        }}
+    ]
+    
+    # Queries specific to the report type
+    if report_type == 'transaction-details':
+        # Get detailed transactions
+        report_pipelines = [[
+            match_stage,
+            {'$sort': {'date': pymongo.DESCENDING}},
+            {'$limit': 1000},  # Limit for performance
+            *_user_info_stages()
+        ]]
+    elif report_type == 'user-activity':
+        # Get user activity data
+        report_pipelines = [[
+            match_stage,
+            {'$group': {
+                '_id': '$user_id',
+                'total_income': {'$sum': {'$cond': [{'$eq': ['$type', 'income']}, '$amount', 0]}},
+                'total_expense': {'$sum': {'$cond': [{'$eq': ['$type', 'expense']}, '$amount', 0]}},
+                'transaction_count': {'$sum': 1}
+            }},
+            {'$sort': {'total_expense': -1}},
+            {'$limit': 50}
+        ]]
+    else:  # overview or financial
+        report_pipelines = [
+            # Category breakdown
+            [
+                match_stage,
+                {'$match': {'type': 'expense'}},
+                {'$group': {
+                    '_id': '$category_name',
+                    'total': {'$sum': '$amount'},
+                    'count': {'$sum': 1}
+                }},
+                {'$sort': {'total': -1}},
+                {'$limit': 20}
+            ],
+            # Monthly trend data as flat {period: 'YYYY-MM', type, total} rows
+            [
+                match_stage,
+                {'$group': {
+                    '_id': {
+                        'period': {'$dateToString': {'format': '%Y-%m', 'date': '$date'}},
+                        'type': '$type'
+                    },
+                    'total': {'$sum': '$amount'}
+                }},
+                {'$project': {'_id': 0, 'period': '$_id.period', 'type': '$_id.type', 'total': 1}},
+                {'$sort': {'period': 1, 'type': 1}}
+            ]
+        ]
+    
+    # The queries are independent, so run them concurrently
+    user_counts, transaction_totals, *report_results = run_parallel(
+        (_aggregate_list, db.users, user_counts_pipeline),
+        (_aggregate_list, db.transactions, transaction_pipeline),
+        *[(_aggregate_list, db.transactions, pipeline) for pipeline in report_pipelines]
+    )
+    
+    # Get system statistics
+    user_counts = user_counts[0]
+    system_stats = {
+        'total_users': user_counts['total'][0]['n'] if user_counts['total'] else 0,
+        'active_users': user_counts['active'][0]['n'] if user_counts['active'] else 0,
+        'total_income': next((item['total'] for item in transaction_totals if item['_id'] == 'income'), 0),
+        'total_expense': next((item['total'] for item in transaction_totals if item['_id'] == 'expense'), 0),
+        'transaction_count': sum(item['count'] for item in transaction_totals)
+    }
+    
+    if report_type == 'transaction-details':
+        transactions = report_results[0]
+    
+        for transaction in transactions:
+            transaction['_id'] = str(transaction['_id'])
+            transaction['date'] = transaction['date'].strftime('%Y-%m-%d')
+            transaction['created_at'] = transaction['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+    
+        report_data = {
+            'system_stats': system_stats,
+            'transactions': transactions,
+            'report_type': report_type,
+            'period': period
+        }
+    
+    elif report_type == 'user-activity':
+        user_activities = report_results[0]
+    
+        # Add user information
+        user_map = _user_info_map(activity['_id'] for activity in user_activities)
+        for activity in user_activities:
+            if activity['_id'] in user_map:
+                activity['user_info'] = user_map[activity['_id']]
+            activity['user_id'] = activity.pop('_id')
+            activity['net_balance'] = activity['total_income'] - activity['total_expense']
+    
+        report_data = {
+            'system_stats': system_stats,
+            'user_activities': user_activities,
+            'report_type': report_type,
+            'period': period
+        }
+    
+    else:
+        categories, monthly_data = report_results
+        
+        # Each category's share of expenses, computed once for every export format
+        total_expense = sum(category['total'] for category in categories)
+        for category in categories:
+            category['percentage'] = (category['total'] / total_expense * 100) if total_expense > 0 else 0
+    
+        report_data = {
+            'system_stats': system_stats,
+            'categories': categories,
+            'monthly_data': monthly_data,
+            'report_type': report_type,
+            'period': period
+        }
+    
+    return report_data
+
+# Generator and MIME type for each system report export format
+SYSTEM_REPORT_FORMATS = {
+    'csv': (ReportGenerator.generate_admin_csv_report, 'text/csv'),
+    'excel': (ReportGenerator.generate_admin_excel_report, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'pdf': (ReportGenerator.generate_admin_pdf_report, 'application/pdf')
+}
+
 @admin_bp.route('/reports/generate', methods=['POST'])
 @admin_bp.route('/reports/generate/', methods=['POST'])
 @token_required
 @admin_required
 def generate_system_report(current_user):
     """Generate and export system-wide reports (admin only)."""
-    from app.utils.report_generator import ReportGenerator
-    
     data = request.get_json()
     
     if not data:
@@ -404,7 +661,7 @@ def generate_system_report(current_user):
     date_to = data.get('end_date')
     period = data.get('period', 'month')  # 'month', 'quarter', 'year'
     
-    if export_format not in ['csv', 'excel', 'pdf']:
+    if export_format not in SYSTEM_REPORT_FORMATS:
         return jsonify({'message': 'Invalid export format. Use csv, excel, or pdf'}), 400
     
     try:
@@ -417,154 +674,38 @@ def generate_system_report(current_user):
             if date_to:
                 date_query['date']['$lte'] = datetime.fromisoformat(date_to)
         
-        # Get system statistics
-        system_stats = {}
-        
-        # Total users
-        system_stats['total_users'] = current_app.mongo_db.users.count_documents({})
-        system_stats['active_users'] = current_app.mongo_db.users.count_documents({'is_active': True})
-        
-        # Transaction totals
-        transaction_pipeline = [
-            {'$match': date_query} if date_query else {'$match': {}},
-            {'$group': {
-                '_id': '$type',
-                'total': {'$sum': '$amount'},
-                'count': {'$sum': 1}
-            }}
-        ]
+        # The dataset depends only on the report parameters, so exporting the
+        # same report in another format reuses it instead of re-aggregating
+        cache_key = f"{REPORT_PREFIX}{report_type}:{period}:{date_from}:{date_to}"
+        cached_dataset = cache.get(cache_key)
+        if cached_dataset is None:
+            report_data = _system_report_data(date_query, report_type, period)
+            # Digest of the canonical JSON, so generated files are keyed by content
+            digest = hashlib.blake2b(
+                current_app.json.dumps(report_data, sort_keys=True).encode('utf-8'),
+                digest_size=16
+            ).hexdigest()
+            cached_dataset = (report_data, digest)
+            cache.set(cache_key, cached_dataset, current_app.config['REPORT_CACHE_TTL'])
+        report_data, digest = cached_dataset
+        
+        # Generate report based on format, reusing a file already built from
+        # the same dataset (e.g. a refreshed dashboard downloading it again)
+        generator, mimetype = SYSTEM_REPORT_FORMATS[export_format]
+        file_key = f"{REPORT_PREFIX}file:{export_format}:{digest}"
+        cached_file = cache.get(file_key)
+        if cached_file is None:
+            file_buffer, filename = run_in_process(generator, report_data)
+            cached_file = (file_buffer.getvalue(), filename)
+            cache.set(file_key, cached_file, current_app.config['REPORT_FILE_CACHE_TTL'])
+        content, filename = cached_file
         
-        transaction_totals = list(current_app.mongo_db.transactions.aggregate(transaction_pipeline))
-        system_stats['total_income'] = next((item['total'] for item in transaction_totals if item['_id'] == 'income'), 0)
-        system_stats['total_expense'] = next((item['total'] for item in transaction_totals if item['_id'] == 'expense'), 0)
-        system_stats['transaction_count'] = sum(item['count'] for item in transaction_totals)
-        
-        # Get transactions based on report type
-        if report_type == 'transaction-details':
-            # Get detailed transactions
-            query = date_query.copy()
-            transactions = list(current_app.mongo_db.transactions.find(query)
-                              .sort('date', pymongo.DESCENDING)
-                              .limit(1000))  # Limit for performance
-            
-            # Add user information
-            for transaction in transactions:
-                transaction['_id'] = str(transaction['_id'])
-                user = current_app.mongo_db.users.find_one({'_id': ObjectId(transaction['user_id'])})
-                if user:
-                    transaction['user_info'] = {
-                        'username': user['username'],
-                        'email': user['email']
-                    }
-                transaction['date'] = transaction['date'].strftime('%Y-%m-%d')
-                transaction['created_at'] = transaction['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            report_data = {
-                'system_stats': system_stats,
-                'transactions': transactions,
-                'report_type': report_type,
-                'period': period
-            }
-            
-        elif report_type == 'user-activity':
-            # Get user activity data
-            user_activity_pipeline = [
-                {'$match': date_query} if date_query else {'$match': {}},
-                {'$group': {
-                    '_id': '$user_id',
-                    'total_income': {'$sum': {'$cond': [{'$eq': ['$type', 'income']}, '$amount', 0]}},
-                    'total_expense': {'$sum': {'$cond': [{'$eq': ['$type', 'expense']}, '$amount', 0]}},
-                    'transaction_count': {'$sum': 1}
-                }},
-                {'$sort': {'total_expense': -1}},
-                {'$limit': 50}
-            ]
-            
-            user_activities = list(current_app.mongo_db.transactions.aggregate(user_activity_pipeline))
-            
-            # Add user information
-            for activity in user_activities:
-                user = current_app.mongo_db.users.find_one({'_id': ObjectId(activity['_id'])})
-                if user:
-                    activity['user_info'] = {
-                        'username': user['username'],
-                        'email': user['email']
-                    }
-                activity['user_id'] = activity.pop('_id')
-                activity['net_balance'] = activity['total_income'] - activity['total_expense']
-            
-            report_data = {
-                'system_stats': system_stats,
-                'user_activities': user_activities,
-                'report_type': report_type,
-                'period': period
-            }
-            
-        else:  # overview or financial
-            # Get category breakdown
-            category_pipeline = [
-                {'$match': date_query} if date_query else {'$match': {}},
-                {'$match': {'type': 'expense'}},
-                {'$group': {
-                    '_id': '$category_name',
-                    'total': {'$sum': '$amount'},
-                    'count': {'$sum': 1}
-                }},
-                {'$sort': {'total': -1}},
-                {'$limit': 20}
-            ]
-            
-            categories = list(current_app.mongo_db.transactions.aggregate(category_pipeline))
-            
-            # Monthly trend data
-            monthly_pipeline = [
-                {'$match': date_query} if date_query else {'$match': {}},
-                {'$group': {
-                    '_id': {
-                        'year': {'$year': '$date'},
-                        'month': {'$month': '$date'},
-                        'type': '$type'
-                    },
-                    'total': {'$sum': '$amount'}
-                }},
-                {'$sort': {'_id.year': 1, '_id.month': 1}}
-            ]
-            
-            monthly_data = list(current_app.mongo_db.transactions.aggregate(monthly_pipeline))
-            
-            report_data = {
-                'system_stats': system_stats,
-                'categories': categories,
-                'monthly_data': monthly_data,
-                'report_type': report_type,
-                'period': period
-            }
-        
-        # Generate report based on format
-        if export_format == 'csv':
-            file_buffer, filename = ReportGenerator.generate_admin_csv_report(report_data)
-            return send_file(
-                file_buffer,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='text/csv'
-            )
-        elif export_format == 'excel':
-            file_buffer, filename = ReportGenerator.generate_admin_excel_report(report_data)
-            return send_file(
-                file_buffer,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-        elif export_format == 'pdf':
-            file_buffer, filename = ReportGenerator.generate_admin_pdf_report(report_data)
-            return send_file(
-                file_buffer,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/pdf'
-            )
+        return send_file(
+            BytesIO(content),
+            as_attachment=True,
+            download_name=filename,
+            mimetype=mimetype
+        )
     
     except Exception as e:
         return jsonify({'message': f'Error generating system report: {str(e)}'}), 500
@@ -575,88 +716,53 @@ def generate_system_report(current_user):
 @admin_required
 def export_all_transactions(current_user):
     """Export all system transactions in various formats (admin only)."""
-    from app.utils.report_generator import ReportGenerator
-    
     # Get format from query params
     export_format = request.args.get('format', 'csv').lower()
     
     if export_format not in ['csv', 'excel', 'pdf']:
         return jsonify({'message': 'Unsupported export format. Use csv, excel, or pdf'}), 400
     
-    # Parse filters
-    user_id = request.args.get('user_id')
-    type_filter = request.args.get('type')
-    category_id = request.args.get('category_id')
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
-    min_amount = request.args.get('min_amount')
-    max_amount = request.args.get('max_amount')
-    search = request.args.get('search')
-    
     # Build query
-    query = {}
-    
-    if user_id:
-        query['user_id'] = user_id
-    
-    if type_filter:
-        query['type'] = type_filter
-    
-    if category_id:
-        query['category_id'] = category_id
-    
-    if date_from or date_to:
-        query['date'] = {}
-        if date_from:
-            query['date']['$gte'] = datetime.fromisoformat(date_from)
-        if date_to:
-            query['date']['$lte'] = datetime.fromisoformat(date_to)
-    
-    if min_amount or max_amount:
-        query['amount'] = {}
-        if min_amount:
-            query['amount']['$gte'] = float(min_amount)
-        if max_amount:
-            query['amount']['$lte'] = float(max_amount)
+    try:
+        query = _build_txn_query(request.args, 'date_from', 'date_to')
+    except ValueError:
+        return jsonify({'message': 'Invalid date or amount filter'}), 400
     
-    if search:
+    search = request.args.get('search', '').strip()
+    if len(search) >= MIN_SEARCH_LENGTH:
+        pattern = _ci_contains(search)
         query['$or'] = [
-            {'note': {'$regex': search, '$options': 'i'}},
-            {'category_name': {'$regex': search, '$options': 'i'}}
+            {'note': pattern},
+            {'category_name': pattern}
         ]
     
-    # Fetch transactions
-    transactions = list(current_app.mongo_db.transactions.find(query).sort('date', pymongo.DESCENDING).limit(5000))
-    
-    # Add user information and convert ObjectId to string
-    for transaction in transactions:
-        transaction['_id'] = str(transaction['_id'])
-        user = current_app.mongo_db.users.find_one({'_id': ObjectId(transaction['user_id'])})
-        if user:
-            transaction['user_info'] = {
-                'username': user['username'],
-                'email': user['email']
-            }
+    # Stream transactions from the cursor instead of materializing all rows
+    cursor = current_app.mongo_db.transactions.find(query) \
+        .sort('date', pymongo.DESCENDING) \
+        .limit(5000) \
+        .batch_size(500)
+    transactions = _with_user_info(cursor)
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     
     try:
-        # Generate report
-        report_generator = ReportGenerator()
-        
         if export_format == 'csv':
-            file_path = report_generator.generate_admin_transactions_csv(transactions)
-            mimetype = 'text/csv'
-            filename = f'admin_transactions_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}.csv'
+            filename = f'admin_transactions_{timestamp}.csv'
+            return Response(
+                stream_with_context(ReportGenerator.generate_admin_transactions_csv(transactions)),
+                mimetype='text/csv',
+                headers={'Content-Disposition': f'attachment; filename={filename}'}
+            )
         elif export_format == 'excel':
-            file_path = report_generator.generate_admin_transactions_excel(transactions)
+            file_buffer = ReportGenerator.generate_admin_transactions_excel(transactions)
             mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            filename = f'admin_transactions_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}.xlsx'
+            filename = f'admin_transactions_{timestamp}.xlsx'
         elif export_format == 'pdf':
-            file_path = report_generator.generate_admin_transactions_pdf(transactions)
+            file_buffer = ReportGenerator.generate_admin_transactions_pdf(transactions)
             mimetype = 'application/pdf'
-            filename = f'admin_transactions_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}.pdf'
+            filename = f'admin_transactions_{timestamp}.pdf'
         
         return send_file(
-            file_path,
+            file_buffer,
             mimetype=mimetype,
             as_attachment=True,
             download_name=filename
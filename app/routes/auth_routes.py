@@ -1,24 +1,54 @@
 from flask import Blueprint, request, jsonify, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.models.user import User
-from app.utils.auth import generate_token
+from app.utils.auth import generate_token, forget_user_status
+from app.utils.indexes import CASE_INSENSITIVE
+from app.utils.passwords import hash_password, verify_password, needs_rehash, dummy_password_hash
 from app.utils.email_service import (
-    generate_verification_token, send_verification_email, send_password_reset_email,
-    save_verification_token, save_password_reset_token, verify_token, delete_verification_token
+    generate_verification_token, send_password_reset_email, send_password_change_notification,
+    deliver_verification_email, save_verification_token, save_password_reset_token,
+    verify_token, delete_verification_token, hash_token,
+    verification_token_document
 )
+from app.utils.executor import run_in_background, run_parallel
+from app.utils.cache import invalidate_stats
 try:
     from bson import ObjectId
 except ImportError:
     from pymongo.objectid import ObjectId
+from pymongo import InsertOne
+from pymongo.errors import DuplicateKeyError
 import re
 import datetime
+from functools import partial
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+# User fields login needs; everything else stays in the database
+LOGIN_PROJECTION = {
+    'password': 1, 'email_verified': 1, 'is_active': 1, 'role': 1,
+    'username': 1, 'email': 1, 'first_name': 1, 'last_name': 1, 'token_version': 1
+}
+
+# Compiled once at import instead of going through re's pattern cache per call
+EMAIL_PATTERN = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+
+# Categories every new user starts with; only user_id is filled in per signup
+DEFAULT_CATEGORY_TEMPLATES = tuple(
+    {'name': name, 'type': category_type, 'is_default': True}
+    for name, category_type in (
+        ('Salary', 'income'),
+        ('Bonus', 'income'),
+        ('Food', 'expense'),
+        ('Transportation', 'expense'),
+        ('Housing', 'expense'),
+        ('Entertainment', 'expense'),
+        ('Utilities', 'expense'),
+    )
+)
+
 def is_valid_email(email):
     """Check if email is valid."""
-    pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
-    return bool(re.match(pattern, email))
+    return EMAIL_PATTERN.match(email) is not None
 
 def is_strong_password(password):
     """Check if password meets strength requirements."""
@@ -30,82 +60,92 @@ def is_strong_password(password):
 @auth_bp.route('/register/', methods=['POST'])
 def register():
     """Register a new user."""
-    data = request.get_json()
+    db = current_app.mongo_db
+    
+    data = request.get_json(silent=True) or {}
+    username = data.get('username')
+    email = data.get('email')
+    password = data.get('password')
     
     # Validate input
-    if not data or not data.get('username') or not data.get('email') or not data.get('password'):
+    if username is not None and not isinstance(username, str):
+        return jsonify({'message': 'Username must be a string'}), 400
+    username = (username or '').strip()
+    
+    if not username or not email or not password:
         return jsonify({'message': 'Missing required fields'}), 400
     
     # Validate email format
-    if not is_valid_email(data.get('email')):
+    if not is_valid_email(email):
         return jsonify({'message': 'Invalid email format'}), 400
     
-    # Check if username already exists
-    if current_app.mongo_db.users.find_one({'username': data.get('username')}):
-        return jsonify({'message': 'Username already exists'}), 409
+    email = email.strip().lower()
+    
+    # Check if username or email already exists (both ignoring case) in one
+    # query; under this collation each $or branch uses its collated index
+    conflict = db.users.find_one(
+        {'$or': [{'username': username}, {'email': email}]},
+        {'username_lower': 1},
+        collation=CASE_INSENSITIVE
+    )
     
-    # Check if email already exists
-    if current_app.mongo_db.users.find_one({'email': data.get('email')}):
+    if conflict:
+        if conflict.get('username_lower') == username.lower():
+            return jsonify({'message': 'Username already exists'}), 409
         return jsonify({'message': 'Email already exists'}), 409
     
     # Validate password strength
-    if not is_strong_password(data.get('password')):
+    if not is_strong_password(password):
         return jsonify({'message': 'Password must be at least 8 characters and include both letters and numbers'}), 400
     
     # Hash the password
-    hashed_password = generate_password_hash(data.get('password'))
+    hashed_password = hash_password(password)
     
     # Generate email verification token
     verification_token = generate_verification_token()
     
     # Create user object
     user = User(
-        username=data.get('username'),
-        email=data.get('email'),
+        username=username,
+        email=email,
         password=hashed_password,
         first_name=data.get('first_name'),
         last_name=data.get('last_name'),
-        email_verified=False,
-        email_verification_token=verification_token
+        email_verified=False
     )
     
     # Save user to database
     user_dict = user.to_dict()
     user_dict['password'] = hashed_password
-    result = current_app.mongo_db.users.insert_one(user_dict)
+    try:
+        result = db.users.insert_one(user_dict)
+    except DuplicateKeyError as e:
+        # Lost a race with a concurrent registration; the violated index
+        # tells whether it was the username or the email
+        if 'email' in (e.details or {}).get('keyPattern', {}):
+            return jsonify({'message': 'Email already exists'}), 409
+        return jsonify({'message': 'Username already exists'}), 409
+    invalidate_stats()
     
-    # Save verification token
-    save_verification_token(result.inserted_id, verification_token)
+    user_id = str(result.inserted_id)
     
-    # Send verification email
-    success, message = send_verification_email(
-        data.get('email'), 
-        data.get('username'), 
-        verification_token
+    # Save the verification token and create the default categories (one
+    # unordered bulk write) concurrently; a brand-new user has no previous
+    # token to replace, so a plain insert is enough
+    run_parallel(
+        (db.auth_tokens.insert_one,
+         verification_token_document(result.inserted_id, verification_token, datetime.datetime.utcnow())),
+        (partial(db.categories.bulk_write, ordered=False),
+         [InsertOne(dict(template, user_id=user_id)) for template in DEFAULT_CATEGORY_TEMPLATES])
     )
     
-    if not success:
-        # Delete the user if email sending fails
-        current_app.mongo_db.users.delete_one({'_id': result.inserted_id})
-        return jsonify({'message': 'Failed to send verification email. Please try again.'}), 500
-    
-    # Create default categories for the user
-    default_categories = [
-        {'name': 'Salary', 'type': 'income', 'user_id': str(result.inserted_id), 'is_default': True},
-        {'name': 'Bonus', 'type': 'income', 'user_id': str(result.inserted_id), 'is_default': True},
-        {'name': 'Food', 'type': 'expense', 'user_id': str(result.inserted_id), 'is_default': True},
-        {'name': 'Transportation', 'type': 'expense', 'user_id': str(result.inserted_id), 'is_default': True},
-        {'name': 'Housing', 'type': 'expense', 'user_id': str(result.inserted_id), 'is_default': True},
-        {'name': 'Entertainment', 'type': 'expense', 'user_id': str(result.inserted_id), 'is_default': True},
-        {'name': 'Utilities', 'type': 'expense', 'user_id': str(result.inserted_id), 'is_default': True},
-    ]
-    
-    if default_categories:
-        current_app.mongo_db.categories.insert_many(default_categories)
+    # Send verification email without holding the request open on SMTP;
+    # failures are flagged on the user and can be retried via resend-verification
+    run_in_background(deliver_verification_email, result.inserted_id, email, username, verification_token)
     
     return jsonify({
         'message': 'User registered successfully. Please check your email to verify your account.',
-        'user_id': str(result.inserted_id),
+        'user_id': user_id,
         'email_verification_required': True
     }), 201
 
@@ -113,8 +153,10 @@ def register():
 @auth_bp.route('/login/', methods=['POST'])
 def login():
     """Log in a user."""
+    db = current_app.mongo_db
+    
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
         
         if not data:
             return jsonify({'message': 'No data provided'}), 400
@@ -131,22 +173,32 @@ def login():
         # Find user by username or email
         user = None
         if '@' in username_or_email:
-            # Search by email (case insensitive)
-            user = current_app.mongo_db.users.find_one({'email': username_or_email.lower()})
+            # Search by email (case insensitive, served by the collated email index)
+            user = db.users.find_one(
+                {'email': username_or_email.lower()},
+                LOGIN_PROJECTION,
+                collation=CASE_INSENSITIVE
+            )
         else:
-            # Search by username (case insensitive)
-            user = current_app.mongo_db.users.find_one({'username': {'$regex': f'^{username_or_email}$', '$options': 'i'}})
+            # Search by username (case insensitive, indexed point lookup)
+            user = db.users.find_one({'username_lower': username_or_email.lower()}, LOGIN_PROJECTION)
         
-        if not user:
+        # Verify password first. Unknown users are checked against a dummy hash
+        # so they take as long as a wrong password and cannot be told apart
+        password_hash = user.get('password') if user else None
+        if not verify_password(password_hash or dummy_password_hash(), password) or not user:
             return jsonify({'message': 'Invalid username/email or password'}), 401
         
         # Check if user is active
         if not user.get('is_active', True):
             return jsonify({'message': 'Account is deactivated. Please contact support.'}), 403
         
-        # Verify password first
-        if not check_password_hash(user['password'], password):
-            return jsonify({'message': 'Invalid username/email or password'}), 401
+        # Upgrade legacy werkzeug hashes to bcrypt now that we have the plaintext
+        if needs_rehash(user['password']):
+            db.users.update_one(
+                {'_id': user['_id']},
+                {'$set': {'password': hash_password(password)}}
+            )
         
         # Check if email is verified
         if not user.get('email_verified', False):
@@ -157,9 +209,9 @@ def login():
             }), 403
         
         # Generate token
-        token = generate_token(user['_id'], user.get('role', 'user'))
+        token = generate_token(user['_id'], user.get('role', 'user'), user.get('token_version', 0))
         
-        current_app.logger.info(f"User {user['username']} logged in successfully")
+        current_app.logger.info("User %s logged in successfully", user['username'])
         
         return jsonify({
             'message': 'Login successful',
@@ -175,7 +227,7 @@ def login():
         }), 200
         
     except Exception as e:
-        current_app.logger.error(f"Error in login: {str(e)}")
+        current_app.logger.error("Error in login: %s", e)
         return jsonify({'message': 'An error occurred during login'}), 500
 
 @auth_bp.route('/forgot-password', methods=['POST'])
@@ -184,7 +236,7 @@ def forgot_password():
     """Send password reset email."""
     try:
         data = request.get_json()
-        current_app.logger.info(f"Forgot password request: {data}")
+        current_app.logger.info("Forgot password request: %s", data)
         
         if not data or not data.get('email'):
             current_app.logger.warning("Forgot password request missing email")
@@ -197,10 +249,14 @@ def forgot_password():
             return jsonify({'message': 'Invalid email format'}), 400
         
         # Find user by email
-        user = current_app.mongo_db.users.find_one({'email': email})
+        user = current_app.mongo_db.users.find_one(
+            {'email': email},
+            {'email_verified': 1, 'username': 1},
+            collation=CASE_INSENSITIVE
+        )
         
         if not user:
-            current_app.logger.warning(f"Forgot password request for non-existent email: {email}")
+            current_app.logger.warning("Forgot password request for non-existent email: %s", email)
             # Return success message for security (don't reveal if email exists)
             return jsonify({'message': 'If the email exists, a password reset link has been sent'}), 200
         
@@ -214,28 +270,22 @@ def forgot_password():
         # Save reset token
         save_password_reset_token(user['_id'], reset_token)
         
-        # Send reset email
-        success, message = send_password_reset_email(
-            email, 
-            user.get('username', 'User'), 
-            reset_token
-        )
+        # Send reset email in the background (delivery errors are logged there)
+        run_in_background(send_password_reset_email, email, user.get('username', 'User'), reset_token)
         
-        if success:
-            current_app.logger.info(f"Password reset email sent successfully to: {email}")
-            return jsonify({'message': 'Password reset link sent to email'}), 200
-        else:
-            current_app.logger.error(f"Failed to send password reset email to {email}: {message}")
-            return jsonify({'message': 'Error sending email', 'error': message}), 500
+        current_app.logger.info("Password reset email queued for: %s", email)
+        return jsonify({'message': 'Password reset link sent to email'}), 200
             
     except Exception as e:
-        current_app.logger.error(f"Error in forgot_password: {str(e)}")
+        current_app.logger.error("Error in forgot_password: %s", e)
         return jsonify({'message': 'An error occurred while processing your request'}), 500
 
 @auth_bp.route('/reset-password', methods=['POST'])
 @auth_bp.route('/reset-password/', methods=['POST'])
 def reset_password():
     """Reset password with token."""
+    db = current_app.mongo_db
+    
     data = request.get_json()
     
     if not data or not data.get('token') or not data.get('password'):
@@ -249,89 +299,90 @@ def reset_password():
         return jsonify({'message': 'Password must be at least 8 characters and include both letters and numbers'}), 400
     
     # Find reset token
-    reset_data = current_app.mongo_db.password_resets.find_one({
-        'token': token,
+    reset_data = db.auth_tokens.find_one({
+        'token_hash': hash_token(token),
+        'type': 'password_reset',
         'expires_at': {'$gt': datetime.datetime.utcnow()}
-    })
+    }, {'user_id': 1, 'token_hash': 1})
     
     if not reset_data:
         return jsonify({'message': 'Invalid or expired token'}), 400
-      # Update user password
-    user_id = reset_data['user_id']
-    hashed_password = generate_password_hash(password)
     
-    # Get user info for notification
-    user = current_app.mongo_db.users.find_one({'_id': ObjectId(user_id)})
+    # Update user password, revoking every token issued under the old one,
+    # and get back the fields the notification needs
+    user_id = reset_data['user_id']
+    hashed_password = hash_password(password)
+    changed_at = datetime.datetime.utcnow()
     
-    current_app.mongo_db.users.update_one(
+    user = db.users.find_one_and_update(
         {'_id': ObjectId(user_id)},
-        {'$set': {'password': hashed_password}}
+        {'$set': {'password': hashed_password, 'password_changed_at': changed_at}, '$inc': {'token_version': 1}},
+        projection={'email': 1, 'username': 1}
     )
+    forget_user_status(str(user_id))
     
     # Delete used token
-    current_app.mongo_db.password_resets.delete_one({'_id': reset_data['_id']})
+    db.auth_tokens.delete_one({'_id': reset_data['_id']})
     
     # Send password change notification
     if user:
-        from app.utils.email_service import send_password_change_notification
-        send_password_change_notification(
-            user['email'], 
-            user.get('username', 'User')
-        )
+        run_in_background(send_password_change_notification, user['email'], user.get('username', 'User'), changed_at)
     
     return jsonify({'message': 'Password reset successful'}), 200
 
 @auth_bp.route('/verify-email', methods=['GET'])
 def verify_email():
     """Verify email with token."""
+    db = current_app.mongo_db
+    
     try:
         token = request.args.get('token')
-        current_app.logger.info(f"Email verification attempt with token: {token[:20]}..." if token else "No token provided")
         
         if not token:
+            current_app.logger.info("Email verification attempt without token")
             return jsonify({'message': 'Verification token is required'}), 400
         
-        # First, check if token exists and get its status
-        token_exists = current_app.mongo_db.email_verifications.find_one({
-            'token': token,
-            'type': 'email_verification'
-        })
-        
-        if not token_exists:
-            current_app.logger.warning(f"Token not found: {token[:20]}...")
-            return jsonify({'message': 'Invalid verification token'}), 400
-        
-        # Check if token is already used
-        if token_exists.get('used', False):
-            current_app.logger.warning(f"Token already used: {token[:20]}...")
-            # Check if user is already verified
-            user = current_app.mongo_db.users.find_one({'_id': ObjectId(token_exists['user_id'])})
-            if user and user.get('email_verified', False):
-                return jsonify({'message': 'Email is already verified. You can now log in.'}), 200
-            else:
-                return jsonify({'message': 'This verification link has already been used'}), 400
-        
-        # Check if token is expired
-        if token_exists.get('expires_at', datetime.datetime.utcnow()) <= datetime.datetime.utcnow():
-            current_app.logger.warning(f"Token expired: {token[:20]}...")
-            return jsonify({'message': 'Verification link has expired. Please request a new one.'}), 400
+        token_query = {'token_hash': hash_token(token), 'type': 'email_verification'}
+        now = datetime.datetime.utcnow()
         
-        # Token is valid, mark as used first to prevent race conditions
-        mark_result = current_app.mongo_db.email_verifications.update_one(
-            {
-                '_id': token_exists['_id'],
-                'used': False  # Only update if not already used
-            },
-            {'$set': {'used': True}}
+        # Claim a valid token in one atomic step: unused and unexpired tokens are
+        # marked used, so concurrent requests cannot both verify with it
+        token_data = db.auth_tokens.find_one_and_update(
+            {**token_query, 'used': False, 'expires_at': {'$gt': now}},
+            {'$set': {'used': True}},
+            projection={'user_id': 1}
         )
-        
-        if mark_result.modified_count == 0:
-            current_app.logger.warning(f"Token was already used by another request: {token[:20]}...")
-            return jsonify({'message': 'This verification link has already been used'}), 400
+        if not token_data:
+            # Work out why the token could not be claimed
+            token_exists = db.auth_tokens.find_one(
+                token_query,
+                {'user_id': 1, 'used': 1, 'expires_at': 1}
+            )
+            
+            if not token_exists:
+                current_app.logger.warning("Email verification token not found")
+                return jsonify({'message': 'Invalid verification token'}), 400
+            
+            # Check if token is already used
+            if token_exists.get('used', False):
+                current_app.logger.warning("Email verification token already used for user: %s", token_exists['user_id'])
+                # Check if user is already verified
+                user = db.users.find_one(
+                    {'_id': ObjectId(token_exists['user_id'])},
+                    {'email_verified': 1}
+                )
+                if user and user.get('email_verified', False):
+                    return jsonify({'message': 'Email is already verified. You can now log in.'}), 200
+                else:
+                    return jsonify({'message': 'This verification link has already been used'}), 400
+            
+            # Otherwise the token is expired
+            current_app.logger.warning("Email verification token expired for user: %s", token_exists['user_id'])
+            return jsonify({'message': 'Verification link has expired. Please request a new one.'}), 400
         
         # Update user email verification status
-        user_id = token_exists['user_id']
-        result = current_app.mongo_db.users.update_one(
+        user_id = token_data['user_id']
+        result = db.users.update_one(
             {'_id': ObjectId(user_id)},
             {
                 '$set': {'email_verified': True},
@@ -339,21 +390,22 @@ def verify_email():
             }
         )
         
+        # The update's own counts tell the outcomes apart without re-reading
+        # the user: no match means no user, a match without a change means
+        # the email was already verified
+        if result.matched_count == 0:
+            current_app.logger.error("User not found: %s", user_id)
+            return jsonify({'message': 'User not found'}), 404
+        
         if result.modified_count == 0:
-            # Check if user exists and is already verified
-            user = current_app.mongo_db.users.find_one({'_id': ObjectId(user_id)})
-            if user and user.get('email_verified', False):
-                current_app.logger.info(f"User already verified: {user_id}")
-                return jsonify({'message': 'Email is already verified. You can now log in.'}), 200
-            else:
-                current_app.logger.error(f"User not found: {user_id}")
-                return jsonify({'message': 'User not found'}), 404
-        
-        current_app.logger.info(f"Email verified successfully for user: {user_id}")
+            current_app.logger.info("User already verified: %s", user_id)
+            return jsonify({'message': 'Email is already verified. You can now log in.'}), 200
+        
+        current_app.logger.info("Email verified successfully for user: %s", user_id)
         return jsonify({'message': 'Email verified successfully. You can now log in.'}), 200
         
     except Exception as e:
-        current_app.logger.error(f"Error in verify_email: {str(e)}")
+        current_app.logger.error("Error in verify_email: %s", e)
         return jsonify({'message': 'An error occurred during email verification'}), 500
 
 @auth_bp.route('/resend-verification', methods=['POST'])
@@ -372,7 +424,11 @@ def resend_verification():
             return jsonify({'message': 'Invalid email format'}), 400
         
         # Find user by email
-        user = current_app.mongo_db.users.find_one({'email': email})
+        user = current_app.mongo_db.users.find_one(
+            {'email': email},
+            {'email_verified': 1, 'username': 1},
+            collation=CASE_INSENSITIVE
+        )
         
         if not user:
             return jsonify({'message': 'User not found'}), 404
@@ -387,29 +443,15 @@ def resend_verification():
         # Generate new verification token
         verification_token = generate_verification_token()
         
-        # Update user with new token
-        current_app.mongo_db.users.update_one(
-            {'_id': user['_id']},
-            {'$set': {'email_verification_token': verification_token}}
-        )
-        
         # Save verification token
         save_verification_token(user['_id'], verification_token)
         
-        # Send verification email
-        success, message = send_verification_email(
-            email, 
-            user.get('username', 'User'), 
-            verification_token
-        )
+        # Send verification email in the background
+        run_in_background(deliver_verification_email, user['_id'], email, user.get('username', 'User'), verification_token)
         
-        if success:
-            current_app.logger.info(f"Verification email resent successfully to: {email}")
-            return jsonify({'message': 'Verification email sent successfully. Please check your inbox.'}), 200
-        else:
-            current_app.logger.error(f"Failed to resend verification email to {email}: {message}")
-            return jsonify({'message': 'Error sending email', 'error': message}), 500
+        current_app.logger.info("Verification email queued for: %s", email)
+        return jsonify({'message': 'Verification email sent successfully. Please check your inbox.'}), 200
             
     except Exception as e:
-        current_app.logger.error(f"Error in resend_verification: {str(e)}")
+        current_app.logger.error("Error in resend_verification: %s", e)
         return jsonify({'message': 'An error occurred while sending verification email'}), 500
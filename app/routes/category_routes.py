@@ -1,10 +1,20 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.utils.auth import token_required
 from app.models.category import Category
-from bson.objectid import ObjectId
+from app.utils.validation import to_object_id
+from app.utils.cache import invalidate_user, invalidate_stats
+from app.utils.conditional import bump_data_version
 
 category_bp = Blueprint('category', __name__, url_prefix='/api/categories')
 
+# Fields a new category must provide, and the allowed category types
+REQUIRED_CATEGORY_FIELDS = ('name', 'type')
+# A tuple, not a set: membership tests must not raise on unhashable JSON values
+CATEGORY_TYPES = ('income', 'expense')
+
+# Fields returned by the category listing
+CATEGORY_LIST_PROJECTION = {'name': 1, 'type': 1, 'is_default': 1, 'user_id': 1}
+
 @category_bp.route('/', methods=['POST'])
 @token_required
 def add_category(current_user):
@@ -15,13 +25,12 @@ def add_category(current_user):
         return jsonify({'message': 'No data provided'}), 400
     
     # Validate required fields
-    required_fields = ['name', 'type']
-    for field in required_fields:
+    for field in REQUIRED_CATEGORY_FIELDS:
         if field not in data:
             return jsonify({'message': f'Missing required field: {field}'}), 400
     
     # Validate category type
-    if data['type'] not in ['income', 'expense']:
+    if data['type'] not in CATEGORY_TYPES:
         return jsonify({'message': 'Category type must be either income or expense'}), 400
     
     # Check if category with the same name already exists for this user
@@ -56,25 +65,18 @@ def get_categories(current_user):
     # Parse query parameters
     type_filter = request.args.get('type')  # 'income' or 'expense'
     
-    # Build query - get both default categories and user's custom categories
-    query = {
-        '$or': [
-            {'user_id': current_user['sub']},
-            {'is_default': True, 'user_id': current_user['sub']}
-        ]
-    }
+    # Build query - default categories are seeded per user, so user_id alone
+    # matches both the defaults and the user's custom categories
+    query = {'user_id': current_user['sub']}
     
     if type_filter:
         query['type'] = type_filter
     
-    # Query database
-    categories = current_app.mongo_db.categories.find(query).sort('name', 1)
+    # Query database, fetching only the fields the listing returns
+    categories = current_app.mongo_db.categories.find(query, CATEGORY_LIST_PROJECTION).sort('name', 1)
     
     # Convert to list of dictionaries
-    categories_list = []
-    for category in categories:
-        category['_id'] = str(category['_id'])
-        categories_list.append(category)
+    categories_list = [{**category, '_id': str(category['_id'])} for category in categories]
     
     return jsonify(categories_list), 200
 
@@ -83,20 +85,16 @@ def get_categories(current_user):
 @token_required
 def get_category(current_user, category_id):
     """Get a specific category."""
-    try:
-        # Query includes user's custom categories and default categories
-        query = {
-            '_id': ObjectId(category_id),
-            '$or': [
-                {'user_id': current_user['sub']},
-                {'is_default': True, 'user_id': current_user['sub']}
-            ]
-        }
-        
-        category = current_app.mongo_db.categories.find_one(query)
-    except:
+    category_oid = to_object_id(category_id)
+    if category_oid is None:
         return jsonify({'message': 'Invalid category ID'}), 400
     
+    # Query includes user's custom categories and default categories
+    category = current_app.mongo_db.categories.find_one({
+        '_id': category_oid,
+        'user_id': current_user['sub']
+    })
+    
     if not category:
         return jsonify({'message': 'Category not found or access denied'}), 404
     
@@ -109,21 +107,24 @@ def get_category(current_user, category_id):
 @token_required
 def update_category(current_user, category_id):
     """Update a category."""
+    db = current_app.mongo_db
+    
     data = request.get_json()
     
     if not data:
         return jsonify({'message': 'No data provided'}), 400
     
-    # Check if category exists and belongs to user (not a default category)
-    try:
-        category = current_app.mongo_db.categories.find_one({
-            '_id': ObjectId(category_id),
-            'user_id': current_user['sub'],
-            'is_default': {'$ne': True}  # Ensure it's not a default category
-        })
-    except:
+    category_oid = to_object_id(category_id)
+    if category_oid is None:
         return jsonify({'message': 'Invalid category ID'}), 400
     
+    # Check if category exists and belongs to user (not a default category)
+    category = db.categories.find_one({
+        '_id': category_oid,
+        'user_id': current_user['sub'],
+        'is_default': {'$ne': True}  # Ensure it's not a default category
+    })
+    
     if not category:
         return jsonify({'message': 'Category not found, access denied, or cannot modify default category'}), 404
     
@@ -132,11 +133,11 @@ def update_category(current_user, category_id):
     
     if 'name' in data:
         # Check if another category with this name exists for this user
-        existing_category = current_app.mongo_db.categories.find_one({
+        existing_category = db.categories.find_one({
             'name': data['name'],
             'type': category['type'],
             'user_id': current_user['sub'],
-            '_id': {'$ne': ObjectId(category_id)}
+            '_id': {'$ne': category_oid}
         })
         
         if existing_category:
@@ -145,23 +146,26 @@ def update_category(current_user, category_id):
         update_data['name'] = data['name']
     
     if 'type' in data:
-        if data['type'] not in ['income', 'expense']:
+        if data['type'] not in CATEGORY_TYPES:
             return jsonify({'message': 'Category type must be either income or expense'}), 400
         update_data['type'] = data['type']
     
     # Update category
     if update_data:
-        current_app.mongo_db.categories.update_one(
-            {'_id': ObjectId(category_id)},
+        db.categories.update_one(
+            {'_id': category_oid},
             {'$set': update_data}
         )
         
         # Update category name in transactions
         if 'name' in update_data:
-            current_app.mongo_db.transactions.update_many(
+            db.transactions.update_many(
                 {'category_id': category_id},
                 {'$set': {'category_name': update_data['name']}}
             )
+            invalidate_user(current_user['sub'])
+            invalidate_stats()
+            bump_data_version(current_user['sub'])
     
     return jsonify({'message': 'Category updated successfully'}), 200
 
@@ -170,11 +174,33 @@ def update_category(current_user, category_id):
 @token_required
 def delete_category(current_user, category_id):
     """Delete a category."""
-    try:
-        # Check if it's a default category (cannot be deleted)
-        category = current_app.mongo_db.categories.find_one({
-            '_id': ObjectId(category_id)
-        })
+    db = current_app.mongo_db
+    
+    category_oid = to_object_id(category_id)
+    if category_oid is None:
+        return jsonify({'message': 'Invalid category ID'}), 400
+    
+    # Check if category is used in any of the user's transactions
+    transactions_count = db.transactions.count_documents({
+        'category_id': category_id,
+        'user_id': current_user['sub']
+    })
+    
+    # Common case: delete the user's own unused custom category in one step
+    deleted = None
+    if transactions_count == 0:
+        deleted = db.categories.find_one_and_delete({
+            '_id': category_oid,
+            'user_id': current_user['sub'],
+            'is_default': {'$ne': True}  # Default categories cannot be deleted
+        }, projection={'_id': 1})
+    
+    if not deleted:
+        # Work out why the category was not deleted
+        category = db.categories.find_one(
+            {'_id': category_oid},
+            {'is_default': 1, 'user_id': 1}
+        )
         
         if not category:
             return jsonify({'message': 'Category not found'}), 404
@@ -185,27 +211,9 @@ def delete_category(current_user, category_id):
         if category.get('user_id') != current_user['sub']:
             return jsonify({'message': 'Access denied'}), 403
         
-        # Check if category is used in any transactions
-        transactions_count = current_app.mongo_db.transactions.count_documents({
-            'category_id': category_id,
-            'user_id': current_user['sub']
-        })
-        
-        if transactions_count > 0:
-            return jsonify({
-                'message': 'Category is used in transactions and cannot be deleted',
-                'transactions_count': transactions_count
-            }), 400
-        
-        # Delete category
-        result = current_app.mongo_db.categories.delete_one({
-            '_id': ObjectId(category_id),
-            'user_id': current_user['sub']
-        })
-        
-        if result.deleted_count == 0:
-            return jsonify({'message': 'Category not found or access denied'}), 404
-        
-        return jsonify({'message': 'Category deleted successfully'}), 200
-    except:
-        return jsonify({'message': 'Invalid category ID'}), 400
+        return jsonify({
+            'message': 'Category is used in transactions and cannot be deleted',
+            'transactions_count': transactions_count
+        }), 400
+    
+    return jsonify({'message': 'Category deleted successfully'}), 200
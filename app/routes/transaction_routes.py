@@ -1,12 +1,172 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app, send_file, Response, stream_with_context
 from app.utils.auth import token_required
 from app.models.transaction import Transaction
+from app.utils.report_generator import ReportGenerator
+from app.utils.indexes import CASE_INSENSITIVE
+from app.utils.pagination import apply_keyset, next_cursor
+from app.utils.cache import cache, user_key, invalidate_user, invalidate_stats
+from app.utils.validation import to_object_id
+from app.utils.executor import run_parallel
+from app.utils.conditional import user_etag, not_modified, set_etag, bump_data_version
 from bson.objectid import ObjectId
+from bson.regex import Regex
 from datetime import datetime
+from functools import lru_cache, partial
+import hashlib
+import json
 import pymongo
+import re
 
 transaction_bp = Blueprint('transaction', __name__, url_prefix='/api/transactions')
 
+# Fields a new transaction must provide, and the allowed transaction types
+REQUIRED_TRANSACTION_FIELDS = ('amount', 'type', 'category_id')
+# A tuple, not a set: membership tests must not raise on unhashable JSON values
+TRANSACTION_TYPES = ('income', 'expense')
+
+# Most transactions a single bulk delete or duplicate may target
+MAX_BULK_IDS = 1000
+
+# Fields returned by the list/search endpoints and written by the exports.
+# The list _id is converted server-side so rows arrive ready to serialize.
+LIST_PROJECTION = {
+    '_id': {'$toString': '$_id'},
+    'amount': 1, 'type': 1, 'category_id': 1, 'category_name': 1, 'date': 1, 'note': 1
+}
+EXPORT_PROJECTION = {'_id': 0, 'amount': 1, 'type': 1, 'category_name': 1, 'date': 1, 'note': 1}
+
+# Search terms at least this long also match inside the note/category name
+MIN_CONTAINS_LENGTH = 3
+
+def _search_clauses(search):
+    """Case-insensitive match on the note or category name.
+
+    Short, autocomplete-style terms match as a prefix range: the bounds are
+    collation-aware, unlike $regex, so with the CASE_INSENSITIVE collation
+    each clause seeks a (user_id, field) index. Longer terms match anywhere,
+    through an escaped regex so user input is never a pattern.
+    """
+    if len(search) < MIN_CONTAINS_LENGTH:
+        prefix = {'$gte': search, '$lt': search + '\uffff'}
+        return [{'note': prefix}, {'category_name': prefix}]
+    
+    pattern = Regex(re.escape(search), 'i')
+    return [{'note': pattern}, {'category_name': pattern}]
+
+@lru_cache(maxsize=1024)
+def _parse_date(value):
+    """Parse an ISO 8601 date; memoized since clients resend the same bounds."""
+    return datetime.fromisoformat(value)
+
+def _range(args, low_keys, high_keys, cast):
+    """Build a {$gte, $lte} filter from the first arg set under each key group.
+    
+    Returns None when neither bound is given; cast errors raise ValueError.
+    """
+    low = next((args[key] for key in low_keys if args.get(key)), None)
+    high = next((args[key] for key in high_keys if args.get(key)), None)
+    if not (low or high):
+        return None
+    
+    bounds = {}
+    if low:
+        bounds['$gte'] = cast(low)
+    if high:
+        bounds['$lte'] = cast(high)
+    return bounds
+
+def _build_query(user_id, args):
+    """Build the list/search/export filter from request args.
+    
+    Returns (query, collation): searches need the collation of the search
+    indexes, plain listings keep the default so (user_id, date) applies.
+    Raises ValueError on malformed dates or amounts.
+    """
+    get = args.get
+    query = {'user_id': user_id}
+    
+    # Text search in note and category name ('q' is the search endpoint's alias)
+    search = (get('search') or get('q') or '').strip()
+    if search:
+        query['$or'] = _search_clauses(search)
+    
+    type_filter = get('type')
+    if type_filter in TRANSACTION_TYPES:
+        query['type'] = type_filter
+    
+    category_id = get('category_id')
+    if category_id:
+        query['category_id'] = category_id
+    
+    # Date and amount ranges, accepting both parameter spellings
+    date_range = _range(args, ('date_from', 'start_date'), ('date_to', 'end_date'), _parse_date)
+    if date_range:
+        query['date'] = date_range
+    
+    amount_range = _range(args, ('amount_min', 'min_amount'), ('amount_max', 'max_amount'), float)
+    if amount_range:
+        query['amount'] = amount_range
+    
+    return query, CASE_INSENSITIVE if search else None
+
+def _record_write(user_id):
+    """Drop the user's cached results and bump the version their ETags use."""
+    invalidate_user(user_id)
+    invalidate_stats()
+    bump_data_version(user_id)
+
+def _find_category(category_oid):
+    """Look up a category's name straight from the database so writes never see a stale or deleted one."""
+    return current_app.mongo_db.categories.find_one({'_id': category_oid}, {'name': 1})
+
+def _count_key(query):
+    """Cache key for the total of query, scoped to the query's user."""
+    digest = hashlib.blake2b(
+        json.dumps(query, sort_keys=True, default=str).encode('utf-8'),
+        digest_size=16
+    ).hexdigest()
+    return user_key(query['user_id'], 'count', digest)
+
+def _fetch_page(collection, query, page_query, sort, skip, limit, collation=None, projection=LIST_PROJECTION):
+    """Return (total, documents) for one page of query.
+    
+    The total is cached per user for COUNT_CACHE_TTL seconds. On a cache miss
+    for an offset page, the total and the page come back from a single $facet
+    aggregation instead of two round-trips.
+    """
+    cache_key = _count_key(query)
+    total = cache.get(cache_key)
+    
+    if total is None and page_query is query:
+        # The $match and $sort run before $facet, so they still use the index
+        result = next(collection.aggregate([
+            {'$match': query},
+            {'$sort': dict(sort)},
+            {'$facet': {
+                'data': [{'$skip': skip}, {'$limit': limit}, {'$project': projection}],
+                'total': [{'$count': 'n'}]
+            }}
+        ], collation=collation))
+        total = result['total'][0]['n'] if result['total'] else 0
+        cache.set(cache_key, total, current_app.config['COUNT_CACHE_TTL'])
+        return total, result['data']
+    
+    if total is not None:
+        return total, _find_page(collection, page_query, sort, skip, limit, collation, projection)
+    
+    # Keyset page with an uncached total: the count and the page are
+    # independent, so overlap their round-trips
+    total, documents = run_parallel(
+        (partial(collection.count_documents, collation=collation), query),
+        (_find_page, collection, page_query, sort, skip, limit, collation, projection)
+    )
+    cache.set(cache_key, total, current_app.config['COUNT_CACHE_TTL'])
+    return total, documents
+
+def _find_page(collection, query, sort, skip, limit, collation, projection):
+    """Fetch one sorted page of query as a list."""
+    return list(collection.find(query, projection, collation=collation).sort(sort).skip(skip).limit(limit))
+
 @transaction_bp.route('/', methods=['POST'])
 @token_required
 def add_transaction(current_user):
@@ -17,17 +177,20 @@ def add_transaction(current_user):
         return jsonify({'message': 'No data provided'}), 400
     
     # Validate required fields
-    required_fields = ['amount', 'type', 'category_id']
-    for field in required_fields:
+    for field in REQUIRED_TRANSACTION_FIELDS:
         if field not in data:
             return jsonify({'message': f'Missing required field: {field}'}), 400
     
     # Validate transaction type
-    if data['type'] not in ['income', 'expense']:
+    if data['type'] not in TRANSACTION_TYPES:
         return jsonify({'message': 'Transaction type must be either income or expense'}), 400
     
     # Check if category exists
-    category = current_app.mongo_db.categories.find_one({'_id': ObjectId(data['category_id'])})
+    category_oid = to_object_id(data['category_id'])
+    if category_oid is None:
+        return jsonify({'message': 'Invalid category ID'}), 400
+    
+    category = _find_category(category_oid)
     if not category:
         return jsonify({'message': 'Category not found'}), 404
     
@@ -38,12 +201,13 @@ def add_transaction(current_user):
         type=data['type'],
         category_id=data['category_id'],
         category_name=category['name'],
-        date=datetime.fromisoformat(data['date']) if 'date' in data else datetime.utcnow(),
+        date=_parse_date(data['date']) if 'date' in data else datetime.utcnow(),
         note=data.get('note')
     )
     
     # Save transaction to database
     result = current_app.mongo_db.transactions.insert_one(transaction.to_dict())
+    _record_write(current_user['sub'])
     
     return jsonify({
         'message': 'Transaction added successfully',
@@ -54,99 +218,88 @@ def add_transaction(current_user):
 @token_required
 def get_transactions(current_user):
     """Get all transactions for the current user with enhanced multi-field search."""
-    # Parse query parameters - Enhanced like admin routes
-    search = request.args.get('search', '')  # General search query
-    type_filter = request.args.get('type')
-    category_id = request.args.get('category_id')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    min_amount = request.args.get('min_amount')
-    max_amount = request.args.get('max_amount')
-    
-    # Enhanced search parameters
-    date_from = request.args.get('date_from') or start_date
-    date_to = request.args.get('date_to') or end_date
-    amount_min = request.args.get('amount_min') or min_amount
-    amount_max = request.args.get('amount_max') or max_amount
+    # Clients that already hold this exact page get a bodyless 304
+    etag = user_etag(current_user['sub'])
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
     
     # Pagination and sorting
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
     sort_by = request.args.get('sort_by', 'date')  # 'date', 'amount', 'category'
     sort_order = request.args.get('sort_order', 'desc')  # 'asc', 'desc'
+    after = request.args.get('after')  # Cursor from a previous page's next_cursor
     
-    # Build query
-    query = {'user_id': current_user['sub']}
-    
-    # Enhanced text search in multiple fields
-    if search:
-        query['$or'] = [
-            {'note': {'$regex': search, '$options': 'i'}},
-            {'category_name': {'$regex': search, '$options': 'i'}}
-        ]
-    
-    # Type filter
-    if type_filter:
-        query['type'] = type_filter
-        
-    # Category filter
-    if category_id:
-        query['category_id'] = category_id
-    
-    # Date range filter
-    if date_from or date_to:
-        query['date'] = {}
-        if date_from:
-            query['date']['$gte'] = datetime.fromisoformat(date_from)
-        if date_to:
-            query['date']['$lte'] = datetime.fromisoformat(date_to)
-    
-    # Amount range filter
-    if amount_min or amount_max:
-        query['amount'] = {}
-        if amount_min:
-            query['amount']['$gte'] = float(amount_min)
-        if amount_max:
-            query['amount']['$lte'] = float(amount_max)
+    # Build query - Enhanced multi-field search like admin routes
+    try:
+        query, collation = _build_query(current_user['sub'], request.args)
+    except ValueError:
+        return jsonify({'message': 'Invalid date or amount filter'}), 400
     
     # Sort configuration
     sort_field = sort_by
     sort_direction = pymongo.DESCENDING if sort_order == 'desc' else pymongo.ASCENDING
     
+    # Keyset pagination when a cursor is given, page offset otherwise
+    if after:
+        try:
+            page_query = apply_keyset(query, after, sort_field, sort_direction)
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        skip = 0
+    else:
+        page_query = query
+        skip = (page - 1) * per_page
+    
     # Query database with pagination
-    total = current_app.mongo_db.transactions.count_documents(query)
-    transactions = current_app.mongo_db.transactions.find(query) \
-        .sort(sort_field, sort_direction) \
-        .skip((page - 1) * per_page) \
-        .limit(per_page)
-    
-    # Convert to list of dictionaries
-    transactions_list = []
-    for transaction in transactions:
-        transaction['_id'] = str(transaction['_id'])
-        transactions_list.append(transaction)
+    total, transactions = _fetch_page(
+        current_app.mongo_db.transactions,
+        query,
+        page_query,
+        [(sort_field, sort_direction), ('_id', sort_direction)],
+        skip,
+        per_page,
+        collation
+    )
     
-    return jsonify({
-        'transactions': transactions_list,
+    # _id is already a string from the projection, so rows pass through as-is
+    response = jsonify({
+        'transactions': transactions,
         'total': total,
         'page': page,
         'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
-    }), 200
+        'pages': (total + per_page - 1) // per_page,
+        'next_cursor': next_cursor(transactions, sort_field, per_page)
+    })
+    return set_etag(response, etag), 200
 
 @transaction_bp.route('/search-suggestions', methods=['GET'])
 @transaction_bp.route('/search-suggestions/', methods=['GET'])
 @token_required
 def get_search_suggestions(current_user):
     """Get search suggestions for autocomplete."""
+    # Suggestions only change when the user writes a transaction
+    cache_key = user_key(current_user['sub'], 'suggestions')
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return jsonify({'suggestions': cached}), 200
+    
     try:
-        # Get unique notes and category names from user's transactions
+        # Get unique notes and category names from user's transactions,
+        # capping each set so the result stays small for long histories
         pipeline = [
             {'$match': {'user_id': current_user['sub']}},
+            # Only indexed fields, so the (user_id, note, category_name) index covers the scan
+            {'$project': {'_id': 0, 'note': 1, 'category_name': 1}},
             {'$group': {
                 '_id': None,
                 'notes': {'$addToSet': '$note'},
                 'categories': {'$addToSet': '$category_name'}
+            }},
+            {'$project': {
+                'notes': {'$slice': ['$notes', 100]},
+                'categories': {'$slice': ['$categories', 100]}
             }}
         ]
         
@@ -164,6 +317,7 @@ def get_search_suggestions(current_user):
         
         # Remove duplicates and limit
         unique_suggestions = list(set(suggestions))[:20]
+        cache.set(cache_key, unique_suggestions, current_app.config['SUGGESTIONS_CACHE_TTL'])
         
         return jsonify({'suggestions': unique_suggestions}), 200
     except Exception as e:
@@ -175,14 +329,15 @@ def get_search_suggestions(current_user):
 @token_required
 def get_transaction(current_user, transaction_id):
     """Get a specific transaction."""
-    try:
-        transaction = current_app.mongo_db.transactions.find_one({
-            '_id': ObjectId(transaction_id),
-            'user_id': current_user['sub']
-        })
-    except:
+    transaction_oid = to_object_id(transaction_id)
+    if transaction_oid is None:
         return jsonify({'message': 'Invalid transaction ID'}), 400
     
+    transaction = current_app.mongo_db.transactions.find_one({
+        '_id': transaction_oid,
+        'user_id': current_user['sub']
+    })
+    
     if not transaction:
         return jsonify({'message': 'Transaction not found'}), 404
     
@@ -201,14 +356,15 @@ def update_transaction(current_user, transaction_id):
         return jsonify({'message': 'No data provided'}), 400
     
     # Check if transaction exists and belongs to user
-    try:
-        transaction = current_app.mongo_db.transactions.find_one({
-            '_id': ObjectId(transaction_id),
-            'user_id': current_user['sub']
-        })
-    except:
+    transaction_oid = to_object_id(transaction_id)
+    if transaction_oid is None:
         return jsonify({'message': 'Invalid transaction ID'}), 400
     
+    transaction = current_app.mongo_db.transactions.find_one({
+        '_id': transaction_oid,
+        'user_id': current_user['sub']
+    })
+    
     if not transaction:
         return jsonify({'message': 'Transaction not found or access denied'}), 404
     
@@ -219,13 +375,17 @@ def update_transaction(current_user, transaction_id):
         update_data['amount'] = float(data['amount'])
     
     if 'type' in data:
-        if data['type'] not in ['income', 'expense']:
+        if data['type'] not in TRANSACTION_TYPES:
             return jsonify({'message': 'Transaction type must be either income or expense'}), 400
         update_data['type'] = data['type']
     
     if 'category_id' in data:
         # Check if category exists
-        category = current_app.mongo_db.categories.find_one({'_id': ObjectId(data['category_id'])})
+        category_oid = to_object_id(data['category_id'])
+        if category_oid is None:
+            return jsonify({'message': 'Invalid category ID'}), 400
+        
+        category = _find_category(category_oid)
         if not category:
             return jsonify({'message': 'Category not found'}), 404
         
@@ -234,7 +394,7 @@ def update_transaction(current_user, transaction_id):
     
     if 'date' in data:
         try:
-            update_data['date'] = datetime.fromisoformat(data['date'])
+            update_data['date'] = _parse_date(data['date'])
         except ValueError:
             return jsonify({'message': 'Invalid date format'}), 400
     
@@ -243,9 +403,10 @@ def update_transaction(current_user, transaction_id):
     
     # Update transaction
     current_app.mongo_db.transactions.update_one(
-        {'_id': ObjectId(transaction_id)},
+        {'_id': transaction_oid},
         {'$set': update_data}
     )
+    _record_write(current_user['sub'])
     
     return jsonify({'message': 'Transaction updated successfully'}), 200
 
@@ -254,18 +415,21 @@ def update_transaction(current_user, transaction_id):
 @token_required
 def delete_transaction(current_user, transaction_id):
     """Delete a transaction."""
-    # Check if transaction exists and belongs to user
-    try:
-        result = current_app.mongo_db.transactions.delete_one({
-            '_id': ObjectId(transaction_id),
-            'user_id': current_user['sub']
-        })
-    except:
+    transaction_oid = to_object_id(transaction_id)
+    if transaction_oid is None:
         return jsonify({'message': 'Invalid transaction ID'}), 400
     
+    # Delete only if the transaction belongs to the user
+    result = current_app.mongo_db.transactions.delete_one({
+        '_id': transaction_oid,
+        'user_id': current_user['sub']
+    })
+    
     if result.deleted_count == 0:
         return jsonify({'message': 'Transaction not found or access denied'}), 404
     
+    _record_write(current_user['sub'])
+    
     return jsonify({'message': 'Transaction deleted successfully'}), 200
 
 @transaction_bp.route('/search', methods=['GET'])
@@ -273,9 +437,14 @@ def delete_transaction(current_user, transaction_id):
 @token_required
 def search_transactions(current_user):
     """Advanced search for transactions with enhanced multi-field search."""
-    # Search parameters
-    query_text = request.args.get('q', '')  # General search query
-    search = request.args.get('search', '') or query_text  # Support both parameters
+    # Clients that already hold this exact page get a bodyless 304
+    etag = user_etag(current_user['sub'])
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    # Search parameters, echoed back in the response
+    search = (request.args.get('search') or request.args.get('q') or '').strip()
     amount_min = request.args.get('amount_min')
     amount_max = request.args.get('amount_max')
     type_filter = request.args.get('type')
@@ -286,64 +455,48 @@ def search_transactions(current_user):
     per_page = int(request.args.get('per_page', 20))
     sort_by = request.args.get('sort_by', 'date')  # 'date', 'amount', 'category'
     sort_order = request.args.get('sort_order', 'desc')  # 'asc', 'desc'
+    after = request.args.get('after')  # Cursor from a previous page's next_cursor
     
     # Build base query
-    query = {'user_id': current_user['sub']}
-    
-    # Enhanced text search in note and category name
-    if search:
-        query['$or'] = [
-            {'note': {'$regex': search, '$options': 'i'}},
-            {'category_name': {'$regex': search, '$options': 'i'}}
-        ]
-    
-    # Amount range filter
-    if amount_min or amount_max:
-        query['amount'] = {}
-        if amount_min:
-            query['amount']['$gte'] = float(amount_min)
-        if amount_max:
-            query['amount']['$lte'] = float(amount_max)
-    
-    # Type filter
-    if type_filter and type_filter in ['income', 'expense']:
-        query['type'] = type_filter
-    
-    # Category filter
-    if category_id:
-        query['category_id'] = category_id
-    
-    # Date range filter
-    if date_from or date_to:
-        query['date'] = {}
-        if date_from:
-            query['date']['$gte'] = datetime.fromisoformat(date_from)
-        if date_to:
-            query['date']['$lte'] = datetime.fromisoformat(date_to)
+    try:
+        query, collation = _build_query(current_user['sub'], request.args)
+    except ValueError:
+        return jsonify({'message': 'Invalid date or amount filter'}), 400
     
     # Sort configuration
     sort_field = sort_by
     sort_direction = pymongo.DESCENDING if sort_order == 'desc' else pymongo.ASCENDING
     
+    # Keyset pagination when a cursor is given, page offset otherwise
+    if after:
+        try:
+            page_query = apply_keyset(query, after, sort_field, sort_direction)
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        skip = 0
+    else:
+        page_query = query
+        skip = (page - 1) * per_page
+    
     # Execute query
-    total = current_app.mongo_db.transactions.count_documents(query)
-    transactions = current_app.mongo_db.transactions.find(query) \
-        .sort(sort_field, sort_direction) \
-        .skip((page - 1) * per_page) \
-        .limit(per_page)
-    
-    # Convert to list
-    transactions_list = []
-    for transaction in transactions:
-        transaction['_id'] = str(transaction['_id'])
-        transactions_list.append(transaction)
+    total, transactions = _fetch_page(
+        current_app.mongo_db.transactions,
+        query,
+        page_query,
+        [(sort_field, sort_direction), ('_id', sort_direction)],
+        skip,
+        per_page,
+        collation
+    )
     
-    return jsonify({
-        'transactions': transactions_list,
+    # _id is already a string from the projection, so rows pass through as-is
+    response = jsonify({
+        'transactions': transactions,
         'total': total,
         'page': page,
         'per_page': per_page,
         'pages': (total + per_page - 1) // per_page,
+        'next_cursor': next_cursor(transactions, sort_field, per_page),
         'query': {
             'text': search,
             'amount_min': amount_min,
@@ -353,7 +506,8 @@ def search_transactions(current_user):
             'date_from': date_from,
             'date_to': date_to
         }
-    }), 200
+    })
+    return set_etag(response, etag), 200
 
 @transaction_bp.route('/bulk-delete', methods=['POST'])
 @token_required
@@ -369,101 +523,69 @@ def bulk_delete_transactions(current_user):
     if not isinstance(transaction_ids, list) or not transaction_ids:
         return jsonify({'message': 'Invalid transaction IDs format'}), 400
     
-    try:
-        # Convert to ObjectIds and validate they belong to the user
-        object_ids = [ObjectId(tid) for tid in transaction_ids]
-        
-        # Delete transactions
-        result = current_app.mongo_db.transactions.delete_many({
-            '_id': {'$in': object_ids},
-            'user_id': current_user['sub']
-        })
-        
-        return jsonify({
-            'message': f'{result.deleted_count} transactions deleted successfully',
-            'deleted_count': result.deleted_count
-        }), 200
+    if len(transaction_ids) > MAX_BULK_IDS:
+        return jsonify({'message': f'Cannot delete more than {MAX_BULK_IDS} transactions at once'}), 400
     
-    except Exception as e:
-        return jsonify({'message': 'Error deleting transactions'}), 400
+    # Convert to ObjectIds, skipping malformed ids; the delete filter
+    # checks that the rest belong to the user
+    object_ids = [ObjectId(tid) for tid in transaction_ids if ObjectId.is_valid(tid)]
+    if not object_ids:
+        return jsonify({'message': 'Invalid transaction IDs format'}), 400
+    
+    # Delete transactions
+    result = current_app.mongo_db.transactions.delete_many({
+        '_id': {'$in': object_ids},
+        'user_id': current_user['sub']
+    })
+    _record_write(current_user['sub'])
+    
+    return jsonify({
+        'message': f'{result.deleted_count} transactions deleted successfully',
+        'deleted_count': result.deleted_count
+    }), 200
 
 @transaction_bp.route('/export', methods=['GET'])
 @transaction_bp.route('/export/', methods=['GET'])
 @token_required
 def export_transactions(current_user):
     """Export user's transactions in various formats."""
-    from app.utils.report_generator import ReportGenerator
-    
     # Get format from query params
     export_format = request.args.get('format', 'csv').lower()
     
     if export_format not in ['csv', 'excel', 'pdf']:
         return jsonify({'message': 'Unsupported export format. Use csv, excel, or pdf'}), 400
     
-    # Parse filters
-    type_filter = request.args.get('type')
-    category_id = request.args.get('category_id')
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
-    min_amount = request.args.get('min_amount')
-    max_amount = request.args.get('max_amount')
-    search = request.args.get('search')
-    
-    # Build query
-    query = {'user_id': current_user['sub']}
-    
-    if type_filter:
-        query['type'] = type_filter
-    
-    if category_id:
-        query['category_id'] = category_id
-    
-    if date_from or date_to:
-        query['date'] = {}
-        if date_from:
-            query['date']['$gte'] = datetime.fromisoformat(date_from)
-        if date_to:
-            query['date']['$lte'] = datetime.fromisoformat(date_to)
-    
-    if min_amount or max_amount:
-        query['amount'] = {}
-        if min_amount:
-            query['amount']['$gte'] = float(min_amount)
-        if max_amount:
-            query['amount']['$lte'] = float(max_amount)
-    
-    if search:
-        query['$or'] = [
-            {'note': {'$regex': search, '$options': 'i'}},
-            {'category_name': {'$regex': search, '$options': 'i'}}
-        ]
-    
-    # Fetch transactions
-    transactions = list(current_app.mongo_db.transactions.find(query).sort('date', pymongo.DESCENDING))
+    # Build query from the same filters as the listing
+    try:
+        query, collation = _build_query(current_user['sub'], request.args)
+    except ValueError:
+        return jsonify({'message': 'Invalid date or amount filter'}), 400
     
-    # Convert ObjectId to string
-    for transaction in transactions:
-        transaction['_id'] = str(transaction['_id'])
+    # Stream transactions from the cursor instead of materializing all rows
+    transactions = current_app.mongo_db.transactions.find(query, EXPORT_PROJECTION, collation=collation) \
+        .sort('date', pymongo.DESCENDING) \
+        .batch_size(1000)
+    filename = f'transactions_{current_user["sub"]}_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}'
     
     try:
         # Generate report
-        report_generator = ReportGenerator()
-        
         if export_format == 'csv':
-            file_path = report_generator.generate_transactions_csv(transactions, current_user['sub'])
-            mimetype = 'text/csv'
-            filename = f'transactions_{current_user["sub"]}_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}.csv'
+            return Response(
+                stream_with_context(ReportGenerator.generate_transactions_csv(transactions)),
+                mimetype='text/csv',
+                headers={'Content-Disposition': f'attachment; filename={filename}.csv'}
+            )
         elif export_format == 'excel':
-            file_path = report_generator.generate_transactions_excel(transactions, current_user['sub'])
+            file_buffer = ReportGenerator.generate_transactions_excel(transactions)
             mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            filename = f'transactions_{current_user["sub"]}_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}.xlsx'
+            filename = f'{filename}.xlsx'
         elif export_format == 'pdf':
-            file_path = report_generator.generate_transactions_pdf(transactions, current_user['sub'])
+            file_buffer = ReportGenerator.generate_transactions_pdf(transactions)
             mimetype = 'application/pdf'
-            filename = f'transactions_{current_user["sub"]}_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}.pdf'
+            filename = f'{filename}.pdf'
         
         return send_file(
-            file_path,
+            file_buffer,
             mimetype=mimetype,
             as_attachment=True,
             download_name=filename
@@ -476,34 +598,78 @@ def export_transactions(current_user):
 @token_required
 def duplicate_transaction(current_user, transaction_id):
     """Duplicate an existing transaction."""
-    try:
-        # Find the original transaction
-        original = current_app.mongo_db.transactions.find_one({
-            '_id': ObjectId(transaction_id),
-            'user_id': current_user['sub']
-        })
-        
-        if not original:
-            return jsonify({'message': 'Transaction not found'}), 404
-        
-        # Create new transaction data
-        new_transaction = Transaction(
-            user_id=current_user['sub'],
-            amount=original['amount'],
-            type=original['type'],
-            category_id=original['category_id'],
-            category_name=original['category_name'],
-            date=datetime.utcnow(),  # Use current date
-            note=f"Copy of: {original.get('note', '')}"
-        )
-        
-        # Save new transaction
-        result = current_app.mongo_db.transactions.insert_one(new_transaction.to_dict())
-        
-        return jsonify({
-            'message': 'Transaction duplicated successfully',
-            'transaction_id': str(result.inserted_id)
-        }), 201
+    transaction_oid = to_object_id(transaction_id)
+    if transaction_oid is None:
+        return jsonify({'message': 'Invalid transaction ID'}), 400
     
-    except Exception as e:
-        return jsonify({'message': 'Error duplicating transaction'}), 400
+    # Find the original transaction
+    original = current_app.mongo_db.transactions.find_one({
+        '_id': transaction_oid,
+        'user_id': current_user['sub']
+    })
+    
+    if not original:
+        return jsonify({'message': 'Transaction not found'}), 404
+    
+    # Create new transaction data
+    new_transaction = Transaction(
+        user_id=current_user['sub'],
+        amount=original['amount'],
+        type=original['type'],
+        category_id=original['category_id'],
+        category_name=original['category_name'],
+        date=datetime.utcnow(),  # Use current date
+        note=f"Copy of: {original.get('note', '')}"
+    )
+    
+    # Save new transaction
+    result = current_app.mongo_db.transactions.insert_one(new_transaction.to_dict())
+    _record_write(current_user['sub'])
+    
+    return jsonify({
+        'message': 'Transaction duplicated successfully',
+        'transaction_id': str(result.inserted_id)
+    }), 201
+
+@transaction_bp.route('/duplicate-bulk', methods=['POST'])
+@token_required
+def duplicate_transactions_bulk(current_user):
+    """Duplicate multiple transactions at once."""
+    data = request.get_json(silent=True)
+    
+    if not data or 'transaction_ids' not in data:
+        return jsonify({'message': 'Transaction IDs are required'}), 400
+    
+    transaction_ids = data['transaction_ids']
+    
+    if not isinstance(transaction_ids, list) or not transaction_ids:
+        return jsonify({'message': 'Invalid transaction IDs format'}), 400
+    
+    if len(transaction_ids) > MAX_BULK_IDS:
+        return jsonify({'message': f'Cannot duplicate more than {MAX_BULK_IDS} transactions at once'}), 400
+    
+    object_ids = [ObjectId(tid) for tid in transaction_ids if ObjectId.is_valid(tid)]
+    if not object_ids:
+        return jsonify({'message': 'Invalid transaction IDs format'}), 400
+    
+    # Copy the user's matching transactions server-side in one round-trip.
+    # Dropping _id makes $merge insert every copy as a new document.
+    now = datetime.utcnow()
+    current_app.mongo_db.transactions.aggregate([
+        {'$match': {'_id': {'$in': object_ids}, 'user_id': current_user['sub']}},
+        {'$project': {
+            '_id': 0,
+            'user_id': 1,
+            'amount': 1,
+            'type': 1,
+            'category_id': 1,
+            'category_name': 1,
+            'date': {'$literal': now},
+            'note': {'$concat': ['Copy of: ', {'$ifNull': ['$note', '']}]},
+            'created_at': {'$literal': now}
+        }},
+        {'$merge': {'into': 'transactions', 'whenNotMatched': 'insert'}}
+    ])
+    _record_write(current_user['sub'])
+    
+    return jsonify({'message': 'Transactions duplicated successfully'}), 201
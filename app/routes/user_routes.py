@@ -1,31 +1,118 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
-from app.utils.auth import token_required
+from flask import Blueprint, request, jsonify, current_app, send_file, Response, stream_with_context, url_for
+from app.utils.auth import token_required, generate_token, forget_user_status
 from app.utils.report_generator import ReportGenerator
-from werkzeug.security import generate_password_hash, check_password_hash
-from bson.objectid import ObjectId
+from app.utils.indexes import CASE_INSENSITIVE
+from app.utils.passwords import hash_password, verify_password
+from app.utils.cache import invalidate_user, invalidate_stats
+from app.utils.conditional import cached_user_view, not_modified, set_etag
+from app.utils.charts import chart_digest, chart_png, prerender_chart
+from app.utils.executor import run_parallel, run_in_process
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timedelta
+import calendar
 import pymongo
 import pandas as pd
 import json
 
 user_bp = Blueprint('user', __name__, url_prefix='/api/user')
 
+# The only transaction fields the dashboard, statistics and chart pipelines read
+AGGREGATE_PROJECTION = {'_id': 0, 'amount': 1, 'type': 1, 'date': 1, 'category_name': 1}
+
+# Static pipeline stages, built once at import; handlers only prepend their
+# $match. Never mutate these, they are shared by every request.
+
+# Totals per (year, month, type), in chronological order
+MONTHLY_TOTALS = (
+    {'$group': {
+        '_id': {
+            'year': {'$year': '$date'},
+            'month': {'$month': '$date'},
+            'type': '$type'
+        },
+        'total': {'$sum': '$amount'}
+    }},
+    {'$sort': {'_id.year': 1, '_id.month': 1}}
+)
+
+# Dashboard year view: totals per (month, type) within the current year
+MONTH_OF_YEAR_TOTALS = (
+    {'$group': {
+        '_id': {'month': {'$month': '$date'}, 'type': '$type'},
+        'total': {'$sum': '$amount'}
+    }},
+    {'$sort': {'_id.month': 1}}
+)
+
+# Totals and counts per category, largest first
+CATEGORY_TOTALS = (
+    {'$group': {
+        '_id': '$category_name',
+        'total': {'$sum': '$amount'},
+        'count': {'$sum': 1}
+    }},
+    {'$sort': {'total': -1}}
+)
+
+# Dashboard totals per (type, category), largest first
+TYPE_CATEGORY_TOTALS = (
+    {'$group': {
+        '_id': {'type': '$type', 'category': '$category_name'},
+        'total': {'$sum': '$amount'}
+    }},
+    {'$sort': {'total': -1}}
+)
+
+# Category chart slices, largest first
+CATEGORY_CHART = (
+    {'$project': AGGREGATE_PROJECTION},
+    {'$group': {
+        '_id': '$category_name',
+        'amount': {'$sum': '$amount'}
+    }},
+    {'$sort': {'amount': -1}}
+)
+
+# Five most recent transactions
+RECENT_TRANSACTIONS = (
+    {'$sort': {'date': pymongo.DESCENDING}},
+    {'$limit': 5}
+)
+
+# Date of the first transaction
+FIRST_DATE = ({'$group': {'_id': None, 'date': {'$min': '$date'}}},)
+
+def _pivot_monthly(items):
+    """Pivot ($month[, $year], type) group totals into one income/expense/balance row per month."""
+    if not items:
+        return pd.DataFrame(columns=['income', 'expense', 'balance']).rename_axis('month')
+    
+    frame = pd.json_normalize(items)
+    if '_id.year' in frame:
+        frame['month'] = frame['_id.year'].astype(str) + '-' + frame['_id.month'].map('{:02d}'.format)
+    else:
+        frame['month'] = frame['_id.month']
+    
+    months = frame.pivot_table(index='month', columns='_id.type', values='total', aggfunc='sum', fill_value=0)
+    months = months.reindex(columns=['income', 'expense'], fill_value=0).sort_index()
+    months.columns.name = None
+    months['balance'] = months['income'] - months['expense']
+    return months
+
 @user_bp.route('/profile', methods=['GET'])
 @user_bp.route('/profile/', methods=['GET'])
 @token_required
 def get_profile(current_user):
     """Get the current user's profile."""
-    user = current_app.mongo_db.users.find_one({'_id': ObjectId(current_user['sub'])})
+    # Password hash never leaves the database
+    user = current_app.mongo_db.users.find_one({'_id': current_user['_oid']}, {'password': 0})
     
     if not user:
         return jsonify({'message': 'User not found'}), 404
     
     user['_id'] = str(user['_id'])
     
-    # Remove password
-    if 'password' in user:
-        del user['password']
-    
     return jsonify(user), 200
 
 @user_bp.route('/profile', methods=['PUT'])
@@ -48,21 +135,27 @@ def update_profile(current_user):
     
     # Email validation and uniqueness check
     if 'email' in update_data:
+        # Emails are stored lowercased and compared ignoring case
+        update_data['email'] = str(update_data['email']).strip().lower()
+        
         # Check if email is already used by another user
-        existing_user = current_app.mongo_db.users.find_one({
+        email_taken = current_app.mongo_db.users.count_documents({
             'email': update_data['email'],
-            '_id': {'$ne': ObjectId(current_user['sub'])}
-        })
+            '_id': {'$ne': current_user['_oid']}
+        }, limit=1, collation=CASE_INSENSITIVE)
         
-        if existing_user:
+        if email_taken:
             return jsonify({'message': 'Email already in use'}), 409
     
-    # Update user
+    # Update user; the unique email index settles races with the check above
     if update_data:
-        current_app.mongo_db.users.update_one(
-            {'_id': ObjectId(current_user['sub'])},
-            {'$set': update_data}
-        )
+        try:
+            current_app.mongo_db.users.update_one(
+                {'_id': current_user['_oid']},
+                {'$set': update_data}
+            )
+        except DuplicateKeyError:
+            return jsonify({'message': 'Email already in use'}), 409
     
     return jsonify({'message': 'Profile updated successfully'}), 200
 
@@ -76,14 +169,14 @@ def change_password(current_user):
     if not data or not data.get('current_password') or not data.get('new_password'):
         return jsonify({'message': 'Current password and new password are required'}), 400
     
-    # Get user
-    user = current_app.mongo_db.users.find_one({'_id': ObjectId(current_user['sub'])})
+    # Get user (only the password hash is needed)
+    user = current_app.mongo_db.users.find_one({'_id': current_user['_oid']}, {'password': 1})
     
     if not user:
         return jsonify({'message': 'User not found'}), 404
     
     # Verify current password
-    if not check_password_hash(user['password'], data['current_password']):
+    if not verify_password(user.get('password'), data['current_password']):
         return jsonify({'message': 'Current password is incorrect'}), 401
     
     # Validate new password strength
@@ -91,18 +184,29 @@ def change_password(current_user):
         return jsonify({'message': 'Password must be at least 8 characters long'}), 400
     
     # Update password
-    hashed_password = generate_password_hash(data['new_password'])
-    
-    current_app.mongo_db.users.update_one(
-        {'_id': ObjectId(current_user['sub'])},
-        {'$set': {'password': hashed_password}}
+    hashed_password = hash_password(data['new_password'])
+    
+    # Revoke every other session's token and hand this one a fresh token
+    user = current_app.mongo_db.users.find_one_and_update(
+        {'_id': current_user['_oid']},
+        {'$set': {'password': hashed_password, 'password_changed_at': datetime.utcnow()}, '$inc': {'token_version': 1}},
+        projection={'token_version': 1, 'role': 1},
+        return_document=ReturnDocument.AFTER
     )
+    forget_user_status(current_user['sub'])
     
-    return jsonify({'message': 'Password changed successfully'}), 200
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+    
+    return jsonify({
+        'message': 'Password changed successfully',
+        'token': generate_token(current_user['sub'], user.get('role', 'user'), user['token_version'])
+    }), 200
 
 @user_bp.route('/dashboard', methods=['GET'])
 @user_bp.route('/dashboard/', methods=['GET'])
 @token_required
+@cached_user_view
 def get_dashboard(current_user):
     """Get dashboard statistics for the current user."""
     # Get date range
@@ -115,16 +219,15 @@ def get_dashboard(current_user):
     if date_range == 'month':
         # Start of current month
         start_date = datetime(today.year, today.month, 1)
-        # Starting from next month, then subtract 1 day to get last day of current month
-        end_date = (datetime(today.year, today.month + 1, 1) 
-                    if today.month < 12 
-                    else datetime(today.year + 1, 1, 1)) - timedelta(days=1)
+        # End of the last day of the current month, so its transactions are included
+        last_day = calendar.monthrange(today.year, today.month)[1]
+        end_date = datetime(today.year, today.month, last_day, 23, 59, 59, 999999)
         date_filter = {'date': {'$gte': start_date, '$lte': end_date}}
     elif date_range == 'year':
         # Start of current year
         start_date = datetime(today.year, 1, 1)
-        # End of current year
-        end_date = datetime(today.year, 12, 31)
+        # End of current year (through the end of December 31st)
+        end_date = datetime(today.year, 12, 31, 23, 59, 59, 999999)
         date_filter = {'date': {'$gte': start_date, '$lte': end_date}}
     
     # Base query for user's transactions
@@ -133,96 +236,63 @@ def get_dashboard(current_user):
     if date_filter:
         base_query.update(date_filter)
     
-    # Total income
-    income_query = base_query.copy()
-    income_query['type'] = 'income'
-    total_income = sum(t['amount'] for t in current_app.mongo_db.transactions.find(income_query))
+    # Every dashboard figure comes from one $facet over the matched
+    # transactions, so the page costs a single round-trip
+    facets = {
+        # Per type and category; the type totals are summed from these
+        # groups instead of accumulating the same documents twice
+        'by_category': [*TYPE_CATEGORY_TOTALS],
+        'recent': [*RECENT_TRANSACTIONS]
+    }
     
-    # Total expense
-    expense_query = base_query.copy()
-    expense_query['type'] = 'expense'
-    total_expense = sum(t['amount'] for t in current_app.mongo_db.transactions.find(expense_query))
+    if date_range not in ('month', 'year'):
+        # For 'all' range, the daily average spans from the first transaction
+        facets['first'] = [*FIRST_DATE]
     
-    # Balance
-    balance = total_income - total_expense
+    if date_range == 'year':
+        # Monthly comparison (for year view)
+        facets['monthly'] = [*MONTH_OF_YEAR_TOTALS]
+    
+    results = next(current_app.mongo_db.transactions.aggregate([
+        {'$match': base_query},
+        {'$facet': facets}
+    ], allowDiskUse=True))
+    
+    # Total income and expense, and the expense category breakdown
+    totals = {'income': 0, 'expense': 0}
+    category_breakdown = []
+    for item in results['by_category']:
+        transaction_type = item['_id']['type']
+        totals[transaction_type] = totals.get(transaction_type, 0) + item['total']
+        if transaction_type == 'expense':
+            category_breakdown.append({'_id': item['_id']['category'], 'total': item['total']})
     
-    # Category breakdown
-    pipeline = [
-        {'$match': expense_query},
-        {'$group': {
-            '_id': '$category_name',
-            'total': {'$sum': '$amount'}
-        }},
-        {'$sort': {'total': -1}}
-    ]
+    total_income = totals['income']
+    total_expense = totals['expense']
     
-    category_breakdown = list(current_app.mongo_db.transactions.aggregate(pipeline))
+    # Balance
+    balance = total_income - total_expense
     
     # Daily average
     if date_range == 'month' or date_range == 'year':
         days_in_period = (end_date - start_date).days + 1
         daily_avg = total_expense / days_in_period if days_in_period > 0 else 0
+    elif results['first']:
+        days_span = (today - results['first'][0]['date']).days + 1
+        daily_avg = total_expense / days_span if days_span > 0 else 0
     else:
-        # For 'all' range, calculate actual days from first to last transaction
-        first_transaction = current_app.mongo_db.transactions.find_one(
-            {'user_id': current_user['sub']},
-            sort=[('date', pymongo.ASCENDING)]
-        )
-        
-        if first_transaction:
-            days_span = (today - first_transaction['date']).days + 1
-            daily_avg = total_expense / days_span if days_span > 0 else 0
-        else:
-            daily_avg = 0
+        daily_avg = 0
     
     # Recent transactions
-    recent_transactions = list(
-        current_app.mongo_db.transactions.find(base_query)
-        .sort('date', pymongo.DESCENDING)
-        .limit(5)
-    )
+    recent_transactions = results['recent']
     
     for transaction in recent_transactions:
         transaction['_id'] = str(transaction['_id'])
     
-    # Monthly comparison (for year view)
+    # One row per month for the response
     monthly_data = []
-    
     if date_range == 'year':
-        # Group by month
-        pipeline = [
-            {'$match': base_query},
-            {'$project': {
-                'month': {'$month': '$date'},
-                'amount': '$amount',
-                'type': '$type'
-            }},
-            {'$group': {
-                '_id': {'month': '$month', 'type': '$type'},
-                'total': {'$sum': '$amount'}
-            }},
-            {'$sort': {'_id.month': 1}}
-        ]
-        
-        monthly_results = list(current_app.mongo_db.transactions.aggregate(pipeline))
-        
-        # Organize results by month
-        months = {}
-        for item in monthly_results:
-            month = item['_id']['month']
-            if month not in months:
-                months[month] = {'income': 0, 'expense': 0}
-            
-            months[month][item['_id']['type']] = item['total']
-        
-        # Convert to list for the response
-        for month, data in months.items():
-            monthly_data.append({
-                'month': month,
-                'income': data['income'],
-                'expense': data['expense'],
-                'balance': data['income'] - data['expense']
-            })
+        monthly_data = _pivot_monthly(results['monthly']).reset_index().to_dict(orient='records')
     
     return jsonify({
         'total_income': total_income,
@@ -244,27 +314,26 @@ def delete_account(current_user):
     if not data or not data.get('password'):
         return jsonify({'message': 'Password is required to delete your account'}), 400
     
-    # Get user
-    user = current_app.mongo_db.users.find_one({'_id': ObjectId(current_user['sub'])})
+    # Get user (only the password hash is needed)
+    user = current_app.mongo_db.users.find_one({'_id': current_user['_oid']}, {'password': 1})
     
     if not user:
         return jsonify({'message': 'User not found'}), 404
     
     # Verify password
-    if not check_password_hash(user['password'], data['password']):
+    if not verify_password(user.get('password'), data['password']):
         return jsonify({'message': 'Password is incorrect'}), 401
     
-    # Delete user's transactions
-    current_app.mongo_db.transactions.delete_many({'user_id': current_user['sub']})
-    
-    # Delete user's custom categories
-    current_app.mongo_db.categories.delete_many({
-        'user_id': current_user['sub'],
-        'is_default': False
-    })
-    
-    # Delete user
-    current_app.mongo_db.users.delete_one({'_id': ObjectId(current_user['sub'])})
+    # Delete user's transactions, custom categories and the user itself.
+    # The three deletes are independent, so issue them concurrently.
+    db = current_app.mongo_db
+    run_parallel(
+        (db.transactions.delete_many, {'user_id': current_user['sub']}),
+        (db.categories.delete_many, {'user_id': current_user['sub'], 'is_default': False}),
+        (db.users.delete_one, {'_id': user['_id']})
+    )
+    invalidate_user(current_user['sub'])
+    invalidate_stats()
     
     return jsonify({'message': 'Account deleted successfully'}), 200
 
@@ -301,48 +370,47 @@ def generate_report(current_user):
     if category_id:
         query['category_id'] = category_id
     
-    # Get transactions
-    transactions = list(current_app.mongo_db.transactions.find(query).sort('date', pymongo.DESCENDING))
-    
-    # Convert ObjectId to string
-    for transaction in transactions:
-        transaction['_id'] = str(transaction['_id'])
-        transaction['date'] = transaction['date'].strftime('%Y-%m-%d')
-        transaction['created_at'] = transaction['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+    if export_format not in ('excel', 'csv', 'pdf'):
+        return jsonify({'message': 'Invalid export format. Use excel, csv, or pdf'}), 400
     
-    if not transactions:
+    if not current_app.mongo_db.transactions.find_one(query, {'_id': 1}):
         return jsonify({'message': 'No transactions found for the specified criteria'}), 404
     
+    # CSV and Excel are written straight from the cursor; only the PDF
+    # table needs every row in memory at once
+    transactions = current_app.mongo_db.transactions.find(query) \
+        .sort('date', pymongo.DESCENDING) \
+        .batch_size(1000)
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    
     try:
         if export_format == 'excel':
-            file_buffer, filename = ReportGenerator.generate_excel_report(transactions, "transactions")
+            file_buffer = ReportGenerator.stream_excel_report(transactions)
             return send_file(
                 file_buffer,
                 as_attachment=True,
-                download_name=filename,
+                download_name=f"transactions_report_{timestamp}.xlsx",
                 mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
             )
         
         elif export_format == 'csv':
-            file_buffer, filename = ReportGenerator.generate_csv_report(transactions)
-            return send_file(
-                file_buffer,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='text/csv'
+            return Response(
+                stream_with_context(ReportGenerator.stream_csv_report(transactions)),
+                mimetype='text/csv',
+                headers={'Content-Disposition': f'attachment; filename=transactions_report_{timestamp}.csv'}
             )
         
-        elif export_format == 'pdf':
-            file_buffer, filename = ReportGenerator.generate_pdf_report(transactions, "transactions")
+        else:
+            # Load into a DataFrame once; the generator formats the dates vectorized
+            transactions = pd.DataFrame(list(transactions))
+            transactions['_id'] = transactions['_id'].astype(str)
+            file_buffer, filename = run_in_process(ReportGenerator.generate_pdf_report, transactions, "transactions")
             return send_file(
                 file_buffer,
                 as_attachment=True,
                 download_name=filename,
                 mimetype='application/pdf'
             )
-        
-        else:
-            return jsonify({'message': 'Invalid export format. Use excel, csv, or pdf'}), 400
     
     except Exception as e:
         return jsonify({'message': f'Error generating report: {str(e)}'}), 500
@@ -350,6 +418,7 @@ def generate_report(current_user):
 @user_bp.route('/statistics', methods=['GET'])
 @user_bp.route('/statistics/', methods=['GET'])
 @token_required
+@cached_user_view
 def get_statistics(current_user):
     """Get detailed statistics for the current user."""
     # Parameters
@@ -366,73 +435,44 @@ def get_statistics(current_user):
         if date_to:
             base_query['date']['$lte'] = datetime.fromisoformat(date_to)
     
-    # Income vs Expense totals
-    income_total = sum(t['amount'] for t in current_app.mongo_db.transactions.find({**base_query, 'type': 'income'}))
-    expense_total = sum(t['amount'] for t in current_app.mongo_db.transactions.find({**base_query, 'type': 'expense'}))
-    
-    # Category breakdown (expenses)
-    expense_pipeline = [
-        {'$match': {**base_query, 'type': 'expense'}},
-        {'$group': {
-            '_id': '$category_name',
-            'total': {'$sum': '$amount'},
-            'count': {'$sum': 1}
-        }},
-        {'$sort': {'total': -1}}
-    ]
-    expense_by_category = list(current_app.mongo_db.transactions.aggregate(expense_pipeline))
-    
-    # Category breakdown (income)
-    income_pipeline = [
-        {'$match': {**base_query, 'type': 'income'}},
-        {'$group': {
-            '_id': '$category_name',
-            'total': {'$sum': '$amount'},
-            'count': {'$sum': 1}
-        }},
-        {'$sort': {'total': -1}}
-    ]
-    income_by_category = list(current_app.mongo_db.transactions.aggregate(income_pipeline))
-    
-    # Monthly trend
-    monthly_pipeline = [
+    # Totals, category breakdowns, monthly trend and count in a single
+    # aggregation: the user's transactions are matched once and each
+    # $facet branch reuses that result
+    facets = next(current_app.mongo_db.transactions.aggregate([
         {'$match': base_query},
-        {'$group': {
-            '_id': {
-                'year': {'$year': '$date'},
-                'month': {'$month': '$date'},
-                'type': '$type'
-            },
-            'total': {'$sum': '$amount'}
-        }},
-        {'$sort': {'_id.year': 1, '_id.month': 1}}
-    ]
-    monthly_data = list(current_app.mongo_db.transactions.aggregate(monthly_pipeline))
-    
-    # Organize monthly data
-    monthly_trends = {}
-    for item in monthly_data:
-        key = f"{item['_id']['year']}-{item['_id']['month']:02d}"
-        if key not in monthly_trends:
-            monthly_trends[key] = {'income': 0, 'expense': 0}
-        monthly_trends[key][item['_id']['type']] = item['total']
-    
-    # Convert to list
-    monthly_list = []
-    for month, data in sorted(monthly_trends.items()):
-        monthly_list.append({
-            'month': month,
-            'income': data['income'],
-            'expense': data['expense'],
-            'balance': data['income'] - data['expense']
-        })
+        {'$project': AGGREGATE_PROJECTION},
+        {'$facet': {
+            'totals': [
+                {'$group': {'_id': '$type', 'total': {'$sum': '$amount'}, 'count': {'$sum': 1}}}
+            ],
+            'expense_by_category': [{'$match': {'type': 'expense'}}, *CATEGORY_TOTALS],
+            'income_by_category': [{'$match': {'type': 'income'}}, *CATEGORY_TOTALS],
+            'monthly': [*MONTHLY_TOTALS],
+            'count': [{'$count': 'n'}]
+        }}
+    ], allowDiskUse=True))
+    
+    # Income vs Expense totals and counts
+    totals = {'income': 0, 'expense': 0}
+    counts = {'income': 0, 'expense': 0}
+    for item in facets['totals']:
+        totals[item['_id']] = item['total']
+        counts[item['_id']] = item['count']
+    income_total = totals['income']
+    expense_total = totals['expense']
+    
+    expense_by_category = facets['expense_by_category']
+    income_by_category = facets['income_by_category']
+    
+    # One row per month, in chronological order
+    monthly_list = _pivot_monthly(facets['monthly']).reset_index().to_dict(orient='records')
     
     # Transaction count
-    total_transactions = current_app.mongo_db.transactions.count_documents(base_query)
+    total_transactions = facets['count'][0]['n'] if facets['count'] else 0
     
     # Average transaction amounts
-    avg_income = income_total / max(1, len(list(current_app.mongo_db.transactions.find({**base_query, 'type': 'income'}))))
-    avg_expense = expense_total / max(1, len(list(current_app.mongo_db.transactions.find({**base_query, 'type': 'expense'}))))
+    avg_income = income_total / max(1, counts['income'])
+    avg_expense = expense_total / max(1, counts['expense'])
     
     return jsonify({
         'summary': {
@@ -448,11 +488,8 @@ def get_statistics(current_user):
         'monthly_trends': monthly_list
     }), 200
 
-@user_bp.route('/charts/category-breakdown', methods=['GET'])
-@user_bp.route('/charts/category-breakdown/', methods=['GET'])
-@token_required
-def get_category_chart(current_user):
-    """Get category breakdown chart data."""
+def _category_chart(current_user):
+    """Category breakdown chart data plus its (chart type, title)."""
     transaction_type = request.args.get('type', 'expense')  # 'income' or 'expense'
     date_from = request.args.get('date_from')
     date_to = request.args.get('date_to')
@@ -468,37 +505,16 @@ def get_category_chart(current_user):
             query['date']['$lte'] = datetime.fromisoformat(date_to)
     
     # Get category breakdown
-    pipeline = [
-        {'$match': query},
-        {'$group': {
-            '_id': '$category_name',
-            'amount': {'$sum': '$amount'}
-        }},
-        {'$sort': {'amount': -1}}
-    ]
+    pipeline = [{'$match': query}, *CATEGORY_CHART]
     
     data = list(current_app.mongo_db.transactions.aggregate(pipeline))
     
     # Format for chart
     chart_data = [{'category': item['_id'], 'amount': item['amount']} for item in data]
-    
-    # Generate chart
-    chart_base64 = ReportGenerator.generate_chart_base64(
-        chart_data, 
-        'pie', 
-        f'{transaction_type.title()} by Category'
-    )
-    
-    return jsonify({
-        'data': chart_data,
-        'chart': chart_base64
-    }), 200
+    return chart_data, ('pie', f'{transaction_type.title()} by Category')
 
-@user_bp.route('/charts/monthly-trend', methods=['GET'])
-@user_bp.route('/charts/monthly-trend/', methods=['GET'])
-@token_required
-def get_monthly_trend_chart(current_user):
-    """Get monthly trend chart data."""
+def _monthly_trend_chart(current_user):
+    """Monthly trends by month, the expense chart data and its (chart type, title)."""
     # Get last 12 months of data
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=365)
@@ -509,45 +525,71 @@ def get_monthly_trend_chart(current_user):
     }
     
     # Group by month and type
-    pipeline = [
-        {'$match': query},
-        {'$group': {
-            '_id': {
-                'year': {'$year': '$date'},
-                'month': {'$month': '$date'},
-                'type': '$type'
-            },
-            'total': {'$sum': '$amount'}
-        }},
-        {'$sort': {'_id.year': 1, '_id.month': 1}}
-    ]
+    pipeline = [{'$match': query}, {'$project': AGGREGATE_PROJECTION}, *MONTHLY_TOTALS]
     
     monthly_data = list(current_app.mongo_db.transactions.aggregate(pipeline))
     
     # Organize data
-    trends = {}
-    for item in monthly_data:
-        key = f"{item['_id']['year']}-{item['_id']['month']:02d}"
-        if key not in trends:
-            trends[key] = {'income': 0, 'expense': 0}
-        trends[key][item['_id']['type']] = item['total']
+    months = _pivot_monthly(monthly_data)
+    trends = months[['income', 'expense']].to_dict(orient='index')
     
-    # Format for chart
-    chart_data = []
-    for month in sorted(trends.keys()):
-        chart_data.append({
-            'date': month,
-            'amount': trends[month]['expense']  # Show expense trend
-        })
-    
-    # Generate chart
-    chart_base64 = ReportGenerator.generate_chart_base64(
-        chart_data, 
-        'line', 
-        'Monthly Expense Trend'
-    )
+    # Format for chart (show expense trend)
+    chart_data = months['expense'].rename('amount').rename_axis('date').reset_index().to_dict(orient='records')
+    return trends, chart_data, ('line', 'Monthly Expense Trend')
+
+def _png_response(current_user, chart_data, spec):
+    """Serve a chart as PNG, revalidated by a fingerprint of its data."""
+    chart_type, title = spec
+    etag = chart_digest(chart_type, title, chart_data)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    
+    png = chart_png(current_user['sub'], chart_type, title, chart_data)
+    return set_etag(Response(png, mimetype='image/png'), etag)
+
+# Chart JSON returns the data and a chart_url; the PNG itself is rendered
+# in the background and served by the .png endpoints, so matplotlib never
+# holds up the JSON response
+
+@user_bp.route('/charts/category-breakdown', methods=['GET'])
+@user_bp.route('/charts/category-breakdown/', methods=['GET'])
+@token_required
+@cached_user_view
+def get_category_chart(current_user):
+    """Get category breakdown chart data."""
+    chart_data, (chart_type, title) = _category_chart(current_user)
+    prerender_chart(current_user['sub'], chart_type, title, chart_data)
+    
+    return jsonify({
+        'data': chart_data,
+        'chart_url': url_for('user.get_category_chart_png', **request.args)
+    }), 200
+
+@user_bp.route('/charts/category-breakdown.png', methods=['GET'])
+@token_required
+def get_category_chart_png(current_user):
+    """Get the category breakdown chart image."""
+    chart_data, spec = _category_chart(current_user)
+    return _png_response(current_user, chart_data, spec)
+
+@user_bp.route('/charts/monthly-trend', methods=['GET'])
+@user_bp.route('/charts/monthly-trend/', methods=['GET'])
+@token_required
+@cached_user_view
+def get_monthly_trend_chart(current_user):
+    """Get monthly trend chart data."""
+    trends, chart_data, (chart_type, title) = _monthly_trend_chart(current_user)
+    prerender_chart(current_user['sub'], chart_type, title, chart_data)
     
     return jsonify({
         'data': trends,
-        'chart': chart_base64
+        'chart_url': url_for('user.get_monthly_trend_chart_png')
     }), 200
+
+@user_bp.route('/charts/monthly-trend.png', methods=['GET'])
+@token_required
+def get_monthly_trend_chart_png(current_user):
+    """Get the monthly expense trend chart image."""
+    _, chart_data, spec = _monthly_trend_chart(current_user)
+    return _png_response(current_user, chart_data, spec)
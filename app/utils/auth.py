@@ -1,16 +1,26 @@
 import jwt
+import base64
+import binascii
 import datetime
-from functools import wraps
+import hmac
+import json
+from functools import lru_cache, wraps
 from flask import request, jsonify, current_app
 from bson.objectid import ObjectId
+from app.utils.cache import cache, user_key, TOKEN_PREFIX
+from app.utils.validation import to_object_id
+import time
 
-def generate_token(user_id, role='user'):
+def generate_token(user_id, role='user', version=0):
     """Generate a JWT token for authentication."""
+    now = datetime.datetime.utcnow()
     payload = {
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1),
-        'iat': datetime.datetime.utcnow(),
+        'exp': now + datetime.timedelta(days=1),
+        'iat': now,
         'sub': str(user_id),
-        'role': role
+        'role': role,
+        # Tokens issued before the user's token_version was bumped are revoked
+        'ver': version
     }
     return jwt.encode(
         payload,
@@ -18,20 +28,87 @@ def generate_token(user_id, role='user'):
         algorithm='HS256'
     )
 
+@lru_cache(maxsize=4)
+def _hs256_signer(secret):
+    """HMAC-SHA256 object keyed with secret, copied per token to skip key setup."""
+    return hmac.new(secret.encode('utf-8'), digestmod='sha256')
+
+def _b64url_decode(segment):
+    """Decode an unpadded base64url JWT segment."""
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+def _decode_hs256(token, secret):
+    """Verify the plain HS256 tokens generate_token issues without going through PyJWT.
+
+    Returns None for anything else (other headers, nbf claims, non-numeric
+    exp) so the caller can fall back to jwt.decode for full validation.
+    """
+    try:
+        header, body, signature = token.split('.')
+        if json.loads(_b64url_decode(header)) != {'alg': 'HS256', 'typ': 'JWT'}:
+            return None
+        
+        signer = _hs256_signer(secret).copy()
+        signer.update(f'{header}.{body}'.encode('ascii'))
+        if not hmac.compare_digest(signer.digest(), _b64url_decode(signature)):
+            raise jwt.InvalidSignatureError('Signature verification failed')
+        
+        payload = json.loads(_b64url_decode(body))
+    except (ValueError, UnicodeError, binascii.Error):
+        raise jwt.DecodeError('Invalid token')
+    
+    if not isinstance(payload, dict) or 'nbf' in payload:
+        return None
+    exp = payload.get('exp')
+    if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+        return None
+    if exp <= time.time():
+        raise jwt.ExpiredSignatureError('Signature has expired')
+    return payload
+
 def decode_token(token):
     """Decode a JWT token."""
+    # Reuse a recent successful decode of the same token
+    cache_key = f"{TOKEN_PREFIX}{token}"
+    payload = cache.get(cache_key)
+    if payload is not None:
+        return payload
+    
     try:
-        payload = jwt.decode(
-            token,
-            current_app.config.get('SECRET_KEY'),
-            algorithms=['HS256']
-        )
+        secret = current_app.config.get('SECRET_KEY')
+        payload = _decode_hs256(token, secret)
+        if payload is None:
+            payload = jwt.decode(token, secret, algorithms=['HS256'])
+        # Parsed once here and cached with the payload, so views never re-parse the id
+        payload['_oid'] = to_object_id(payload.get('sub'))
+        # Never keep a payload cached past the token's own expiry
+        ttl = min(current_app.config['TOKEN_CACHE_TTL'], payload['exp'] - time.time())
+        if ttl > 0:
+            cache.set(cache_key, payload, ttl)
         return payload
     except jwt.ExpiredSignatureError:
         return {'error': 'Token expired. Please log in again.'}
     except jwt.InvalidTokenError:
         return {'error': 'Invalid token. Please log in again.'}
 
+def user_status(user_id):
+    """Return (exists, is_active, token_version) for user_id, cached for TOKEN_CACHE_TTL seconds."""
+    cache_key = user_key(user_id, 'status')
+    status = cache.get(cache_key)
+    if status is None:
+        user = current_app.mongo_db.users.find_one({'_id': ObjectId(user_id)}, {'is_active': 1, 'token_version': 1})
+        status = (
+            user is not None,
+            bool(user and user.get('is_active', True)),
+            (user or {}).get('token_version', 0)
+        )
+        cache.set(cache_key, status, current_app.config['TOKEN_CACHE_TTL'])
+    return status
+
+def forget_user_status(user_id):
+    """Drop the cached status so the next request sees an activation change."""
+    cache.delete(user_key(user_id, 'status'))
+
 def token_required(f):
     """Decorator for views that require authentication."""
     @wraps(f)
@@ -52,16 +129,19 @@ def token_required(f):
             if 'error' in payload:
                 return jsonify({'message': payload['error']}), 401
             
-            # Get user from database
-            user_id = payload['sub']
-            user = current_app.mongo_db.users.find_one({'_id': ObjectId(user_id)})
+            # Check the user still exists, is active and has not revoked the
+            # token; all three come from one briefly cached read
+            exists, is_active, token_version = user_status(payload['sub'])
             
-            if not user:
+            if not exists:
                 return jsonify({'message': 'User not found'}), 401
                 
-            if not user.get('is_active', True):
+            if not is_active:
                 return jsonify({'message': 'Account is deactivated'}), 401
             
+            if payload.get('ver', 0) != token_version:
+                return jsonify({'message': 'Token has been revoked. Please log in again.'}), 401
+            
         except Exception as e:
             return jsonify({'message': str(e)}), 401
             
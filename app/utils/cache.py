@@ -0,0 +1,79 @@
+import threading
+import time
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after a TTL."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        """Cache value under key for ttl seconds."""
+        with self._lock:
+            now = time.monotonic()
+            if key not in self._data and len(self._data) >= self.maxsize:
+                # Make room: drop expired entries, then the oldest ones
+                for stale in [k for k, (_, expires_at) in self._data.items() if expires_at <= now]:
+                    del self._data[stale]
+                while len(self._data) >= self.maxsize:
+                    del self._data[next(iter(self._data))]
+            self._data[key] = (value, now + ttl)
+
+    def delete(self, key):
+        """Drop a single key."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        """Drop every key starting with prefix."""
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        """Drop every key."""
+        with self._lock:
+            self._data.clear()
+
+# Shared per-process cache. Each worker keeps its own copy, so entries must be
+# safe to serve slightly stale for up to their TTL.
+cache = TTLCache()
+
+# Key prefix for the admin dashboard statistics
+STATS_PREFIX = 'stats:'
+
+# Key prefix for decoded JWT payloads
+TOKEN_PREFIX = 'token:'
+
+# Key prefix for aggregated admin system report datasets
+REPORT_PREFIX = 'report:'
+
+# Key prefix for per-user transaction query results
+USER_PREFIX = 'user:'
+
+def user_key(user_id, *parts):
+    """Cache key scoped to one user, so invalidate_user can drop it."""
+    return ':'.join((USER_PREFIX + user_id, *parts))
+
+def invalidate_stats():
+    """Drop the cached admin statistics and report datasets after a write that changes them."""
+    cache.delete_prefix(STATS_PREFIX)
+    cache.delete_prefix(REPORT_PREFIX)
+
+def invalidate_user(user_id):
+    """Drop every cached result derived from the user's transactions."""
+    cache.delete_prefix(f'{USER_PREFIX}{user_id}:')
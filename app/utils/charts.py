@@ -0,0 +1,31 @@
+import hashlib
+import json
+from flask import current_app
+from app.utils.cache import cache, user_key
+from app.utils.executor import run_in_background
+from app.utils.report_generator import ReportGenerator
+
+def chart_digest(chart_type, title, data):
+    """Fingerprint of everything that determines a chart's pixels."""
+    raw = json.dumps([chart_type, title, data], sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+def _render(cache_key, chart_type, title, data):
+    """Render the chart and cache its PNG bytes."""
+    png = ReportGenerator.render_chart_png(data, chart_type, title)
+    cache.set(cache_key, png, current_app.config['CHART_CACHE_TTL'])
+    return png
+
+def prerender_chart(user_id, chart_type, title, data):
+    """Queue the chart to be rendered off the request thread unless already cached."""
+    cache_key = user_key(user_id, 'chart', chart_digest(chart_type, title, data))
+    if cache.get(cache_key) is None:
+        run_in_background(_render, cache_key, chart_type, title, data)
+
+def chart_png(user_id, chart_type, title, data):
+    """PNG bytes for the chart, rendered inline only when this worker has no cached copy."""
+    cache_key = user_key(user_id, 'chart', chart_digest(chart_type, title, data))
+    png = cache.get(cache_key)
+    if png is None:
+        png = _render(cache_key, chart_type, title, data)
+    return png
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import current_app, request
+from app.utils.cache import cache, user_key
+from app.utils.validation import to_object_id
+
+def data_version(user_id):
+    """Return the user's data version, bumped on every transaction write."""
+    user = current_app.mongo_db.users.find_one({'_id': to_object_id(user_id)}, {'data_version': 1})
+    return (user or {}).get('data_version', 0)
+
+def bump_data_version(user_id):
+    """Mark the user's transactions as changed, invalidating their ETags."""
+    current_app.mongo_db.users.update_one({'_id': to_object_id(user_id)}, {'$inc': {'data_version': 1}})
+
+def _etag(*parts):
+    """Short opaque digest of parts."""
+    raw = ':'.join(str(part) for part in parts)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+def user_etag(user_id):
+    """ETag for the current request's view of the user's data.
+
+    The version lives in the database rather than the per-process cache,
+    so a write served by one worker invalidates the ETag on every worker.
+    """
+    return _etag(user_id, data_version(user_id), request.full_path)
+
+def set_etag(response, etag):
+    """Attach etag and make clients revalidate before reusing the response."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
+
+def not_modified(etag):
+    """A 304 response if the client already holds etag, otherwise None."""
+    if etag not in request.if_none_match:
+        return None
+    return set_etag(current_app.response_class(status=304), etag)
+
+def cached_user_view(f):
+    """Cache a token_required view's 200 JSON body per user data version and request path.
+
+    Keying on the version means a write on any worker makes older entries
+    unreachable, so cached bodies are never served stale. Responses carry an
+    ETag from the same version, so polling clients get a bodiless 304.
+    """
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        user_id = current_user['sub']
+        version = str(data_version(user_id))
+        
+        # These views cover date ranges relative to today, so they also
+        # change at midnight even when no transaction was written
+        today = datetime.utcnow().date().isoformat()
+        etag = _etag(user_id, version, today, request.full_path)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+        
+        # Keyed on the same day as the ETag, so a body cached before midnight
+        # is never served under the next day's ETag
+        cache_key = user_key(user_id, 'view', version, today, request.full_path)
+        body = cache.get(cache_key)
+        if body is not None:
+            return set_etag(current_app.response_class(body, status=200, mimetype='application/json'), etag)
+        
+        response = current_app.make_response(f(current_user, *args, **kwargs))
+        if response.status_code == 200:
+            cache.set(cache_key, response.get_data(), current_app.config['VIEW_CACHE_TTL'])
+            set_etag(response, etag)
+        return response
+    
+    return decorated
@@ -1,71 +1,135 @@
 import secrets
+import base64
+import os
+import hashlib
+import hmac
 import datetime
-from flask import current_app
+from flask import current_app, render_template
+from pymongo import ReplaceOne
 try:
     from flask_mail import Message
 except ImportError:
     Message = None
 import uuid
 
+# Token types stored in the auth_tokens collection
+TOKEN_TYPES = ('email_verification', 'password_reset')
+
 def get_mail():
     """Get mail instance from app."""
     from app import mail
     return mail
 
+def send_message(mail, msg):
+    """Send msg over the app's pooled SMTP connections, or a fresh one without a pool."""
+    pool = getattr(current_app, 'smtp_pool', None)
+    if pool is None:
+        mail.send(msg)
+    else:
+        pool.send(msg)
+
 def generate_verification_token():
     """Generate a secure verification token."""
     return secrets.token_urlsafe(32)
 
-def save_verification_token(user_id, token):
-    """Save email verification token to database."""
-    expires_at = datetime.datetime.utcnow() + datetime.timedelta(hours=24)
-    
-    verification_data = {
+def generate_verification_tokens(count):
+    """Generate count tokens like generate_verification_token, from one urandom read."""
+    raw = os.urandom(32 * count)
+    return [
+        base64.urlsafe_b64encode(raw[i:i + 32]).rstrip(b'=').decode('ascii')
+        for i in range(0, 32 * count, 32)
+    ]
+
+def hash_token(token):
+    """HMAC-SHA256 of a token; only this digest is stored and queried."""
+    key = current_app.config['SECRET_KEY'].encode('utf-8')
+    return hmac.new(key, token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def verification_token_document(user_id, token, now):
+    """Email verification token document, valid for 24 hours from now."""
+    return {
         'user_id': str(user_id),
-        'token': token,
+        'token_hash': hash_token(token),
         'type': 'email_verification',
-        'created_at': datetime.datetime.utcnow(),
-        'expires_at': expires_at,
+        'created_at': now,
+        'expires_at': now + datetime.timedelta(hours=24),
         'used': False
     }
-    
-    # Remove any existing verification tokens for this user
-    current_app.mongo_db.email_verifications.delete_many({
-        'user_id': str(user_id),
-        'type': 'email_verification'
-    })
-    
-    current_app.mongo_db.email_verifications.insert_one(verification_data)
 
-def save_password_reset_token(user_id, token):
-    """Save password reset token to database."""
-    expires_at = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
-    
-    reset_data = {
+def _password_reset_document(user_id, token, now):
+    """Password reset token document, valid for 1 hour from now."""
+    return {
         'user_id': str(user_id),
-        'token': token,
+        'token_hash': hash_token(token),
         'type': 'password_reset',
-        'created_at': datetime.datetime.utcnow(),
-        'expires_at': expires_at,
+        'created_at': now,
+        'expires_at': now + datetime.timedelta(hours=1),
         'used': False
     }
+
+def save_verification_token(user_id, token):
+    """Save email verification token to database."""
+    verification_data = verification_token_document(user_id, token, datetime.datetime.utcnow())
     
-    # Remove any existing reset tokens for this user
-    current_app.mongo_db.password_resets.delete_many({
-        'user_id': str(user_id)
-    })
+    # Replace the user's existing verification token (if any) in one atomic upsert
+    current_app.mongo_db.auth_tokens.replace_one(
+        {'user_id': str(user_id), 'type': 'email_verification'},
+        verification_data,
+        upsert=True
+    )
+
+def save_verification_tokens_bulk(user_token_pairs):
+    """Save email verification tokens for many (user_id, token) pairs in one bulk write."""
+    # One token per user, the last pair winning, like repeated single saves
+    tokens = {str(user_id): token for user_id, token in user_token_pairs}
+    if not tokens:
+        return
+    
+    # Each upsert touches only its own user, so they can run in any order
+    now = datetime.datetime.utcnow()
+    current_app.mongo_db.auth_tokens.bulk_write([
+        ReplaceOne(
+            {'user_id': user_id, 'type': 'email_verification'},
+            verification_token_document(user_id, token, now),
+            upsert=True
+        )
+        for user_id, token in tokens.items()
+    ], ordered=False)
+
+def save_password_reset_token(user_id, token):
+    """Save password reset token to database."""
+    reset_data = _password_reset_document(user_id, token, datetime.datetime.utcnow())
     
-    current_app.mongo_db.password_resets.insert_one(reset_data)
+    # Replace the user's existing reset token (if any) in one atomic upsert
+    current_app.mongo_db.auth_tokens.replace_one(
+        {'user_id': str(user_id), 'type': 'password_reset'},
+        reset_data,
+        upsert=True
+    )
+
+def save_password_reset_tokens_bulk(user_token_pairs):
+    """Save password reset tokens for many (user_id, token) pairs in one bulk write."""
+    tokens = {str(user_id): token for user_id, token in user_token_pairs}
+    if not tokens:
+        return
+    
+    now = datetime.datetime.utcnow()
+    current_app.mongo_db.auth_tokens.bulk_write([
+        ReplaceOne(
+            {'user_id': user_id, 'type': 'password_reset'},
+            _password_reset_document(user_id, token, now),
+            upsert=True
+        )
+        for user_id, token in tokens.items()
+    ], ordered=False)
 
 def verify_token(token, token_type='email_verification'):
     """Verify and validate a token."""
-    if token_type == 'email_verification':
-        collection = current_app.mongo_db.email_verifications
-    else:
-        collection = current_app.mongo_db.password_resets
+    if token_type not in TOKEN_TYPES:
+        return None
     
-    token_data = collection.find_one({
-        'token': token,
+    token_data = current_app.mongo_db.auth_tokens.find_one({
+        'token_hash': hash_token(token),
         'type': token_type,
         'expires_at': {'$gt': datetime.datetime.utcnow()},
         'used': False
@@ -75,11 +139,87 @@ def verify_token(token, token_type='email_verification'):
 
 def delete_verification_token(token):
     """Delete or mark verification token as used."""
-    current_app.mongo_db.email_verifications.update_one(
-        {'token': token},
+    current_app.mongo_db.auth_tokens.update_one(
+        {'token_hash': hash_token(token), 'type': 'email_verification'},
         {'$set': {'used': True}}
     )
 
+def deliver_verification_email(user_id, email, username, token):
+    """Send the verification email and record failed deliveries on the user."""
+    success, message = send_verification_email(email, username, token)
+    
+    # A failed delivery is flagged so it can be found and retried via resend-verification
+    if success:
+        update = {'$unset': {'email_send_failed_at': 1}}
+    else:
+        update = {'$set': {'email_send_failed_at': datetime.datetime.utcnow()}}
+    current_app.mongo_db.users.update_one({'_id': user_id}, update)
+    
+    return success, message
+
+def send_messages(mail, messages):
+    """Send messages over one SMTP connection and return each one's exception or None."""
+    pool = getattr(current_app, 'smtp_pool', None)
+    if pool is not None:
+        return pool.send_many(messages)
+    
+    errors = []
+    with mail.connect() as connection:
+        for msg in messages:
+            try:
+                connection.send(msg)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+    return errors
+
+def _verification_message(email, username, token):
+    """Build the verification email for one user."""
+    # Frontend URL - you may need to adjust this based on your frontend setup
+    frontend_url = current_app.config.get('FRONTEND_URL', 'http://localhost:3000')
+    verification_url = f"{frontend_url}/verify-email?token={token}"
+    
+    msg = Message(
+        'Xác thực tài khoản - Money Management App',
+        recipients=[email]
+    )
+    msg.html = render_template('emails/verification.html', username=username, verification_url=verification_url)
+    return msg
+
+def send_verification_emails_batch(items):
+    """Send verification emails for (email, username, token) items over one connection.
+    
+    Returns a (success, message) pair per item, in order.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if Message is None:
+        current_app.logger.error("Flask-Mail not installed")
+        return [(False, "Flask-Mail not installed")] * len(items)
+    
+    mail = get_mail()
+    if mail is None:
+        current_app.logger.error("Mail instance not available")
+        return [(False, "Mail service not configured")] * len(items)
+    
+    try:
+        messages = [_verification_message(email, username, token) for email, username, token in items]
+        errors = send_messages(mail, messages)
+    except Exception as e:
+        current_app.logger.error("Error sending %s verification emails: %s", len(items), e)
+        return [(False, f"Error sending email: {str(e)}")] * len(items)
+    
+    results = []
+    for (email, _, _), error in zip(items, errors):
+        if error is None:
+            results.append((True, "Email verification sent successfully"))
+        else:
+            current_app.logger.error("Error sending verification email to %s: %s", email, error)
+            results.append((False, f"Error sending email: {str(error)}"))
+    current_app.logger.info("Sent %s of %s verification emails", sum(ok for ok, _ in results), len(items))
+    return results
+
 def send_verification_email(email, username, token):
     """Send email verification email."""
     try:
@@ -91,56 +231,17 @@ def send_verification_email(email, username, token):
         if mail is None:
             current_app.logger.error("Mail instance not available")
             return False, "Mail service not configured"
-            
-        # Frontend URL - you may need to adjust this based on your frontend setup
-        frontend_url = current_app.config.get('FRONTEND_URL', 'http://localhost:3000')
-        verification_url = f"{frontend_url}/verify-email?token={token}"
         
-        current_app.logger.info(f"Sending verification email to {email} with URL: {verification_url}")
+        current_app.logger.info("Sending verification email to %s", email)
         
-        msg = Message(
-            'Xác thực tài khoản - Money Management App',
-            sender=current_app.config['MAIL_DEFAULT_SENDER'],
-            recipients=[email]
-        )
+        msg = _verification_message(email, username, token)
         
-        msg.html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2 style="color: #2c3e50;">Chào mừng đến với Money Management App!</h2>
-            
-            <p>Xin chào <strong>{username}</strong>,</p>
-            
-            <p>Cảm ơn bạn đã đăng ký tài khoản. Để hoàn tất quá trình đăng ký, vui lòng xác thực địa chỉ email của bạn bằng cách nhấp vào liên kết bên dưới:</p>
-            
-            <div style="text-align: center; margin: 30px 0;">
-                <a href="{verification_url}" 
-                   style="background-color: #3498db; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                   Xác thực email
-                </a>
-            </div>
-            
-            <p>Hoặc copy và dán liên kết sau vào trình duyệt của bạn:</p>
-            <p style="background-color: #f8f9fa; padding: 10px; border-radius: 5px; word-break: break-all;">
-                {verification_url}
-            </p>
-            
-            <p><strong>Lưu ý:</strong> Liên kết này sẽ hết hạn sau 24 giờ.</p>
-            
-            <p>Nếu bạn không tạo tài khoản này, vui lòng bỏ qua email này.</p>
-            
-            <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
-            <p style="color: #7f8c8d; font-size: 12px;">
-                Email này được gửi tự động, vui lòng không trả lời.<br>
-                © 2025 Money Management App. All rights reserved.
-            </p>        </div>
-        """
-        
-        mail.send(msg)
-        current_app.logger.info(f"Email verification sent successfully to {email}")
+        send_message(mail, msg)
+        current_app.logger.info("Email verification sent successfully to %s", email)
         return True, "Email verification sent successfully"
         
     except Exception as e:
-        current_app.logger.error(f"Error sending verification email to {email}: {str(e)}")
+        current_app.logger.error("Error sending verification email to %s: %s", email, e)
         return False, f"Error sending email: {str(e)}"
 
 def send_password_reset_email(email, username, token):
@@ -156,56 +257,20 @@ def send_password_reset_email(email, username, token):
         
         msg = Message(
             'Đặt lại mật khẩu - Money Management App',
-            sender=current_app.config['MAIL_DEFAULT_SENDER'],
             recipients=[email]
         )
         
-        msg.html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2 style="color: #e74c3c;">Đặt lại mật khẩu</h2>
-            
-            <p>Xin chào <strong>{username}</strong>,</p>
-            
-            <p>Chúng tôi nhận được yêu cầu đặt lại mật khẩu cho tài khoản của bạn. Để đặt lại mật khẩu, vui lòng nhấp vào liên kết bên dưới:</p>
-            
-            <div style="text-align: center; margin: 30px 0;">
-                <a href="{reset_url}" 
-                   style="background-color: #e74c3c; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                   Đặt lại mật khẩu
-                </a>
-            </div>
-            
-            <p>Hoặc copy và dán liên kết sau vào trình duyệt của bạn:</p>
-            <p style="background-color: #f8f9fa; padding: 10px; border-radius: 5px; word-break: break-all;">
-                {reset_url}
-            </p>
-            
-            <p><strong>Lưu ý quan trọng:</strong></p>
-            <ul>
-                <li>Liên kết này sẽ hết hạn sau 1 giờ</li>
-                <li>Liên kết chỉ có thể sử dụng một lần</li>
-                <li>Nếu bạn không yêu cầu đặt lại mật khẩu, vui lòng bỏ qua email này</li>
-            </ul>
-            
-            <p>Để bảo mật tài khoản, không chia sẻ liên kết này với bất kỳ ai.</p>
-            
-            <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
-            <p style="color: #7f8c8d; font-size: 12px;">
-                Email này được gửi tự động, vui lòng không trả lời.<br>
-                © 2025 Money Management App. All rights reserved.
-            </p>
-        </div>
-        """
+        msg.html = render_template('emails/password_reset.html', username=username, reset_url=reset_url)
         
-        mail.send(msg)
+        send_message(mail, msg)
         return True, "Password reset email sent successfully"
         
     except Exception as e:
-        current_app.logger.error(f"Error sending password reset email: {str(e)}")
+        current_app.logger.error("Error sending password reset email: %s", e)
         return False, f"Error sending email: {str(e)}"
 
-def send_password_change_notification(email, username):
-    """Send notification when password is successfully changed."""
+def send_password_change_notification(email, username, changed_at):
+    """Send notification that the password was changed at changed_at (UTC, as stored)."""
     try:
         if Message is None:
             return False, "Flask-Mail not installed"
@@ -213,41 +278,18 @@ def send_password_change_notification(email, username):
         mail = get_mail()
         msg = Message(
             'Mật khẩu đã được thay đổi - Money Management App',
-            sender=current_app.config['MAIL_DEFAULT_SENDER'],
             recipients=[email]
         )
         
-        msg.html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2 style="color: #27ae60;">Mật khẩu đã được thay đổi thành công</h2>
-            
-            <p>Xin chào <strong>{username}</strong>,</p>
-            
-            <p>Mật khẩu của tài khoản Money Management App đã được thay đổi thành công vào lúc:</p>
-            <p><strong>{datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S')}</strong></p>
-            
-            <p>Nếu bạn không thực hiện thay đổi này, vui lòng liên hệ với chúng tôi ngay lập tức để bảo vệ tài khoản của bạn.</p>
-            
-            <div style="background-color: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                <p style="margin: 0; color: #856404;">
-                    <strong>Lời khuyên bảo mật:</strong><br>
-                    • Sử dụng mật khẩu mạnh và duy nhất<br>
-                    • Không chia sẻ thông tin đăng nhập với ai<br>
-                    • Đăng xuất khỏi các thiết bị công cộng
-                </p>
-            </div>
-            
-            <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
-            <p style="color: #7f8c8d; font-size: 12px;">
-                Email này được gửi tự động, vui lòng không trả lời.<br>
-                © 2025 Money Management App. All rights reserved.
-            </p>
-        </div>
-        """
+        msg.html = render_template(
+            'emails/password_changed.html',
+            username=username,
+            changed_at=f"{changed_at:%d/%m/%Y %H:%M:%S} UTC"
+        )
         
-        mail.send(msg)
+        send_message(mail, msg)
         return True, "Password change notification sent"
         
     except Exception as e:
-        current_app.logger.error(f"Error sending password change notification: {str(e)}")
+        current_app.logger.error("Error sending password change notification: %s", e)
         return False, f"Error sending notification: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,10 @@
+from flask import jsonify, current_app
+from pymongo.errors import PyMongoError
+
+def register_error_handlers(app):
+    """Register JSON error handlers shared by all blueprints."""
+
+    @app.errorhandler(PyMongoError)
+    def handle_database_error(error):
+        current_app.logger.exception(f"Database error: {str(error)}")
+        return jsonify({'message': 'Database error'}), 500
@@ -0,0 +1,82 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from flask import current_app
+
+# Shared pool for independent, I/O-bound work (PyMongo releases the GIL while
+# waiting on the network, so threads overlap round-trips well).
+executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='money-worker')
+
+# Separate pool for fire-and-forget background jobs such as outbound email,
+# so a slow SMTP server can never starve request-time query fan-out. It is
+# created on first use so BACKGROUND_WORKERS can come from the app config.
+_background_executor = None
+_background_lock = threading.Lock()
+
+# Process pool for CPU-bound report rendering, which would otherwise hold
+# the GIL and stall every other request thread in the worker
+_process_executor = None
+_process_lock = threading.Lock()
+
+def run_parallel(*calls):
+    """Run (func, *args) tuples concurrently and return their results in order.
+
+    The callables must not need the Flask app context; pass collections or
+    plain values in instead of relying on current_app.
+    """
+    futures = [executor.submit(call[0], *call[1:]) for call in calls]
+    return [future.result() for future in futures]
+
+def _background_pool(app):
+    """The background job pool, sized from BACKGROUND_WORKERS on first use."""
+    global _background_executor
+    if _background_executor is None:
+        with _background_lock:
+            if _background_executor is None:
+                _background_executor = ThreadPoolExecutor(
+                    max_workers=app.config.get('BACKGROUND_WORKERS', 4),
+                    thread_name_prefix='money-background'
+                )
+    return _background_executor
+
+def _process_pool(app):
+    """The report process pool, sized from REPORT_PROCESSES on first use."""
+    global _process_executor
+    if _process_executor is None:
+        with _process_lock:
+            if _process_executor is None:
+                # Spawned rather than forked: forking a threaded server can copy
+                # locks held by other threads, and the MongoClient with them
+                _process_executor = ProcessPoolExecutor(
+                    max_workers=app.config['REPORT_PROCESSES'],
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _process_executor
+
+def run_in_process(func, *args):
+    """Run func(*args) in a worker process and return its result.
+    
+    func must be importable and args picklable; the worker has no app
+    context. Runs inline when REPORT_PROCESSES is 0.
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('REPORT_PROCESSES', 0):
+        return func(*args)
+    return _process_pool(app).submit(func, *args).result()
+
+def run_in_background(func, *args):
+    """Run func(*args) after the response, inside the current app's context."""
+    app = current_app._get_current_object()
+    
+    def run():
+        with app.app_context():
+            try:
+                return func(*args)
+            except Exception:
+                app.logger.exception(f"Background job {func.__name__} failed")
+    
+    # Serverless hosts may freeze the process once the response is sent,
+    # so background jobs can be switched to run inline there
+    if not app.config.get('BACKGROUND_JOBS', True):
+        return run()
+    return _background_pool(app).submit(run)
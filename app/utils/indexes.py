@@ -0,0 +1,112 @@
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+# Case-insensitive collation shared by indexes and the queries that rely on them.
+# A query only uses one of these indexes when it specifies the same collation.
+CASE_INSENSITIVE = {'locale': 'en', 'strength': 2}
+
+# Collections that held tokens before they were merged into auth_tokens
+LEGACY_TOKEN_COLLECTIONS = ['email_verifications', 'password_resets']
+
+def ensure_indexes(db, logger=None):
+    """Create the indexes the API queries rely on (no-op if they already exist)."""
+    indexes = {
+        'users': [
+            ([('username', ASCENDING)], {'collation': CASE_INSENSITIVE}),
+            ([('username_lower', ASCENDING)], {'unique': True, 'sparse': True}),
+            # Unique under the collation, so emails cannot differ only by case
+            ([('email', ASCENDING)], {'unique': True, 'collation': CASE_INSENSITIVE}),
+            ([('first_name', ASCENDING)], {'collation': CASE_INSENSITIVE}),
+            ([('last_name', ASCENDING)], {'collation': CASE_INSENSITIVE}),
+            ([('created_at', DESCENDING), ('_id', DESCENDING)], {}),
+        ],
+        # Compound keys follow the ESR rule: Equality fields first, then the
+        # Sort field (date), so filtered listings sorted by date are served
+        # by an index scan instead of a collection scan plus in-memory sort.
+        'transactions': [
+            # _id breaks ties for keyset pagination over the sort field
+            ([('user_id', ASCENDING), ('date', DESCENDING), ('_id', DESCENDING)], {}),
+            ([('user_id', ASCENDING), ('amount', DESCENDING), ('_id', DESCENDING)], {}),
+            ([('user_id', ASCENDING), ('type', ASCENDING), ('date', DESCENDING)], {}),
+            ([('user_id', ASCENDING), ('category_id', ASCENDING), ('date', DESCENDING)], {}),
+            ([('type', ASCENDING), ('date', DESCENDING)], {}),
+            ([('category_id', ASCENDING), ('date', DESCENDING)], {}),
+            ([('category_id', ASCENDING), ('user_id', ASCENDING)], {}),
+            ([('date', DESCENDING), ('_id', DESCENDING)], {}),
+            # Covers the search suggestions aggregation (no document fetch)
+            ([('user_id', ASCENDING), ('note', ASCENDING), ('category_name', ASCENDING)], {}),
+            # Case-insensitive prefix search on note / category name
+            ([('user_id', ASCENDING), ('note', ASCENDING)], {'collation': CASE_INSENSITIVE}),
+            ([('user_id', ASCENDING), ('category_name', ASCENDING)], {'collation': CASE_INSENSITIVE}),
+        ],
+        # Per-user listings sorted by name and the duplicate-name checks
+        'categories': [
+            ([('user_id', ASCENDING), ('type', ASCENDING), ('name', ASCENDING)], {}),
+            ([('user_id', ASCENDING), ('is_default', ASCENDING)], {}),
+        ],
+        # Tokens are looked up by their HMAC digest, never by raw value.
+        # The TTL indexes let MongoDB reap tokens once expires_at has passed.
+        # (user_id, type) is unique: each save upserts the user's one token.
+        # token_hash stays a unique B-tree rather than a hashed index: hashed
+        # indexes cannot enforce uniqueness, and a B-tree equality probe on a
+        # 64-char digest is already a single root-to-leaf walk.
+        # The partial filter keeps documents without a digest out of the
+        # unique index, where each missing value would collide as null
+        'auth_tokens': [
+            ([('token_hash', ASCENDING)], {'unique': True, 'partialFilterExpression': {'token_hash': {'$type': 'string'}}}),
+            ([('user_id', ASCENDING), ('type', ASCENDING)], {'unique': True}),
+            ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),
+        ],
+    }
+
+    # Backfill normalized fields on documents created before they existed,
+    # so the indexes over them cover every document
+    try:
+        db.users.update_many(
+            {'username_lower': {'$exists': False}, 'username': {'$type': 'string'}},
+            [{'$set': {'username_lower': {'$toLower': '$username'}}}]
+        )
+    except ConnectionFailure as e:
+        if logger:
+            logger.warning(f"Skipping index creation, database unavailable: {str(e)}")
+        return
+    except PyMongoError as e:
+        if logger:
+            logger.warning(f"Could not backfill username_lower: {str(e)}")
+    
+    # Move tokens from the per-type collections into auth_tokens. Every
+    # token document already carries its type, so they merge unchanged.
+    # Documents holding a raw token instead of token_hash predate hashing
+    # and can never match a lookup, so they are dropped with the collection.
+    try:
+        for legacy in db.list_collection_names(filter={'name': {'$in': LEGACY_TOKEN_COLLECTIONS}}):
+            db[legacy].aggregate([
+                {'$match': {'token_hash': {'$type': 'string'}}},
+                {'$merge': {
+                    'into': 'auth_tokens',
+                    'on': '_id',
+                    'whenMatched': 'keepExisting',
+                    'whenNotMatched': 'insert'
+                }}
+            ])
+            db.drop_collection(legacy)
+            # An earlier, unfiltered run may have copied raw-token documents
+            db.auth_tokens.delete_many({'token_hash': {'$not': {'$type': 'string'}}})
+    except PyMongoError as e:
+        if logger:
+            logger.warning(f"Could not migrate tokens into auth_tokens: {str(e)}")
+    
+    for collection_name, specs in indexes.items():
+        collection = db[collection_name]
+        for keys, options in specs:
+            try:
+                collection.create_index(keys, **options)
+            except ConnectionFailure as e:
+                # Database unreachable: skip the rest instead of waiting on every index
+                if logger:
+                    logger.warning(f"Skipping index creation, database unavailable: {str(e)}")
+                return
+            except PyMongoError as e:
+                # Never block startup on an index; queries still work without it
+                if logger:
+                    logger.warning(f"Could not create index {keys} on {collection_name}: {str(e)}")
@@ -0,0 +1,32 @@
+from bson.objectid import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, extended to serialize ObjectIds as strings."""
+
+    @staticmethod
+    def default(o):
+        """Serialize the types the JSON encoder does not handle natively."""
+        if isinstance(o, ObjectId):
+            return str(o)
+        # Dates go through Flask's handler so they stay in HTTP date format
+        return DefaultJSONProvider.default(o)
+
+class OrjsonProvider(MongoJSONProvider):
+    """JSON provider backed by orjson, keeping Flask's output format."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
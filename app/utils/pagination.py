@@ -0,0 +1,45 @@
+import base64
+from bson import json_util
+from bson.objectid import ObjectId
+import pymongo
+
+def encode_cursor(value, object_id):
+    """Encode the sort key of the last returned document as an opaque cursor."""
+    raw = json_util.dumps([value, object_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode a cursor created by encode_cursor into (value, ObjectId)."""
+    try:
+        value, object_id = json_util.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(object_id, ObjectId):
+        raise ValueError('Invalid cursor')
+
+    return value, object_id
+
+def apply_keyset(query, cursor, field, direction=pymongo.DESCENDING):
+    """Restrict query to documents after the cursor in (field, _id) sort order.
+
+    Unlike skip(), the resulting range is seeked through the (field, _id)
+    ordering, so the cost of a page does not grow with its depth.
+    """
+    value, object_id = decode_cursor(cursor)
+    op = '$lt' if direction == pymongo.DESCENDING else '$gt'
+    keyset = {'$or': [
+        {field: {op: value}},
+        {field: value, '_id': {op: object_id}}
+    ]}
+
+    if not query:
+        return keyset
+    return {'$and': [query, keyset]}
+
+def next_cursor(documents, field, per_page):
+    """Cursor for the page after documents, or None when this was the last page."""
+    if len(documents) < per_page or not documents:
+        return None
+    last = documents[-1]
+    return encode_cursor(last.get(field), ObjectId(str(last['_id'])))
@@ -0,0 +1,28 @@
+from functools import lru_cache
+from werkzeug.security import check_password_hash
+import secrets
+from app import bcrypt
+
+# Prefixes of bcrypt hashes; anything else is a legacy werkzeug (pbkdf2/scrypt) hash
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+def hash_password(password):
+    """Hash a password with bcrypt (cost from BCRYPT_LOG_ROUNDS)."""
+    return bcrypt.generate_password_hash(password).decode('utf-8')
+
+def verify_password(password_hash, password):
+    """Check a password against a bcrypt or legacy werkzeug hash."""
+    if not password_hash:
+        return False
+    if password_hash.startswith(BCRYPT_PREFIXES):
+        return bcrypt.check_password_hash(password_hash, password)
+    return check_password_hash(password_hash, password)
+
+def needs_rehash(password_hash):
+    """Whether a stored hash predates the switch to bcrypt."""
+    return not password_hash.startswith(BCRYPT_PREFIXES)
+
+@lru_cache(maxsize=1)
+def dummy_password_hash():
+    """bcrypt hash of a random secret, for timing-safe checks against unknown users."""
+    return hash_password(secrets.token_urlsafe(32))
@@ -1,17 +1,98 @@
 import pandas as pd
-from io import BytesIO
-import matplotlib.pyplot as plt
+import csv
+from itertools import islice
+from io import BytesIO, StringIO, TextIOWrapper
+from openpyxl import Workbook
+from openpyxl.writer.excel import ExcelWriter
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import seaborn as sns
 from datetime import datetime
+from numbers import Number
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
 import base64
+from zipfile import ZipFile, ZIP_DEFLATED
 
 class ReportGenerator:
     """Utility class for generating reports in various formats."""
     
+    # PDF styles are built once and shared by every report; they are only
+    # read when building tables and paragraphs, never modified
+    PDF_STYLES = getSampleStyleSheet()
+    
+    TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    
+    # Smaller header and body text for long transaction listings
+    COMPACT_TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ])
+    
+    @staticmethod
+    def _iso_text(series, unit):
+        """Format a datetime-like series as ISO text in one numpy cast; unit 'D' gives dates, 's' date and time."""
+        # Casting datetime64 to str is a single C loop, unlike strftime per element
+        values = pd.to_datetime(series)
+        text = pd.Series(values.values.astype(f'datetime64[{unit}]').astype(str), index=series.index)
+        if unit != 'D':
+            text = text.str.replace('T', ' ', regex=False)
+        # Missing values stay missing, as with dt.strftime
+        return text.where(values.notna())
+    
+    @staticmethod
+    def _save_workbook(workbook, output):
+        """Save workbook into output and rewind it, deflating at level 1."""
+        # Workbook.save always zips at zlib's default level 6; level 1 is
+        # several times faster for a slightly larger file
+        if workbook.write_only and not workbook.worksheets:
+            workbook.create_sheet()
+        workbook.properties.modified = datetime.utcnow()
+        archive = ZipFile(output, 'w', ZIP_DEFLATED, allowZip64=True, compresslevel=1)
+        ExcelWriter(workbook, archive).save()
+        output.seek(0)
+    
+    @staticmethod
+    def _append_sheet(workbook, title, header, rows):
+        """Add a sheet holding header and rows to a write-only workbook."""
+        worksheet = workbook.create_sheet(title)
+        worksheet.append(header)
+        for row in rows:
+            worksheet.append(row)
+    
+    @staticmethod
+    def _frame_rows(df):
+        """Rows of df as plain tuples: missing values become empty cells, unknown types text."""
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            yield tuple(
+                value if value is None or isinstance(value, (str, Number, datetime)) else str(value)
+                for value in row
+            )
+    
+    @staticmethod
+    def _append_frame(workbook, title, df):
+        """Add df as a sheet of a write-only workbook."""
+        ReportGenerator._append_sheet(workbook, title, [str(column) for column in df.columns], ReportGenerator._frame_rows(df))
+    
     @staticmethod
     def generate_excel_report(data, report_type="transactions", filename=None):
         """Generate Excel report from data."""
@@ -21,35 +102,35 @@ class ReportGenerator:
         
         output = BytesIO()
         
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            if report_type == "transactions":
-                df = pd.DataFrame(data)
-                if not df.empty:
-                    # Convert date columns
-                    if 'date' in df.columns:
-                        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
-                    if 'created_at' in df.columns:
-                        df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
-                
-                df.to_excel(writer, sheet_name='Transactions', index=False)
-            
-            elif report_type == "summary":
-                # Create multiple sheets for summary data
-                if 'transactions' in data:
-                    df_trans = pd.DataFrame(data['transactions'])
-                    if not df_trans.empty:
-                        df_trans.to_excel(writer, sheet_name='Transactions', index=False)
-                
-                if 'summary' in data:
-                    df_summary = pd.DataFrame([data['summary']])
-                    df_summary.to_excel(writer, sheet_name='Summary', index=False)
-                
-                if 'category_breakdown' in data:
-                    df_categories = pd.DataFrame(data['category_breakdown'])
-                    if not df_categories.empty:
-                        df_categories.to_excel(writer, sheet_name='Categories', index=False)
-        
-        output.seek(0)
+        # Write-only mode streams rows to the sheet instead of keeping a cell graph
+        workbook = Workbook(write_only=True)
+        if report_type == "transactions":
+            df = pd.DataFrame(data)
+            if not df.empty:
+                # Convert date columns
+                if 'date' in df.columns:
+                    df['date'] = ReportGenerator._iso_text(df['date'], 'D')
+                if 'created_at' in df.columns:
+                    df['created_at'] = ReportGenerator._iso_text(df['created_at'], 's')
+            
+            ReportGenerator._append_frame(workbook, 'Transactions', df)
+        
+        elif report_type == "summary":
+            # Create multiple sheets for summary data
+            if 'transactions' in data:
+                df_trans = pd.DataFrame(data['transactions'])
+                if not df_trans.empty:
+                    ReportGenerator._append_frame(workbook, 'Transactions', df_trans)
+            
+            if 'summary' in data:
+                ReportGenerator._append_frame(workbook, 'Summary', pd.DataFrame([data['summary']]))
+            
+            if 'category_breakdown' in data:
+                df_categories = pd.DataFrame(data['category_breakdown'])
+                if not df_categories.empty:
+                    ReportGenerator._append_frame(workbook, 'Categories', df_categories)
+        
+        ReportGenerator._save_workbook(workbook, output)
         return output, filename
     
     @staticmethod
@@ -65,9 +146,9 @@ class ReportGenerator:
         if not df.empty:
             # Convert date columns
             if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+                df['date'] = ReportGenerator._iso_text(df['date'], 'D')
             if 'created_at' in df.columns:
-                df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
+                df['created_at'] = ReportGenerator._iso_text(df['created_at'], 's')
         
         csv_data = df.to_csv(index=False)
         output.write(csv_data.encode('utf-8'))
@@ -75,16 +156,51 @@ class ReportGenerator:
         
         return output, filename
     
+    REPORT_COLUMNS = ['_id', 'user_id', 'amount', 'type', 'category_id', 'category_name', 'date', 'note', 'created_at']
+    
+    @staticmethod
+    def _report_row(transaction):
+        """Flatten a stored transaction into the full report columns."""
+        row = [transaction.get(column) for column in ReportGenerator.REPORT_COLUMNS]
+        row[0] = str(row[0])
+        if isinstance(row[6], datetime):
+            row[6] = row[6].date().isoformat()
+        if isinstance(row[8], datetime):
+            row[8] = row[8].isoformat(' ', 'seconds')
+        return row
+    
+    @staticmethod
+    def stream_csv_report(transactions):
+        """Yield CSV chunks for a full transaction report; consumes any iterable lazily."""
+        rows = map(ReportGenerator._report_row, transactions)
+        return ReportGenerator._csv_chunks(ReportGenerator.REPORT_COLUMNS, rows)
+    
+    @staticmethod
+    def stream_excel_report(transactions):
+        """Generate a full transaction report workbook row by row."""
+        output = BytesIO()
+        
+        # Write-only mode streams rows to the sheet instead of keeping a cell graph
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('Transactions')
+        worksheet.append(ReportGenerator.REPORT_COLUMNS)
+        for transaction in transactions:
+            worksheet.append(ReportGenerator._report_row(transaction))
+        
+        ReportGenerator._save_workbook(workbook, output)
+        return output
+    
     @staticmethod
     def generate_pdf_report(data, report_type="transactions", filename=None):
         """Generate PDF report from data."""
+        generated_at = datetime.now()
         if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = generated_at.strftime("%Y%m%d_%H%M%S")
             filename = f"{report_type}_report_{timestamp}.pdf"
         
         output = BytesIO()
         doc = SimpleDocTemplate(output, pagesize=letter)
-        styles = getSampleStyleSheet()
+        styles = ReportGenerator.PDF_STYLES
         story = []
         
         # Title
@@ -93,12 +209,12 @@ class ReportGenerator:
         story.append(Spacer(1, 12))
         
         # Date
-        date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        date_str = generated_at.strftime("%Y-%m-%d %H:%M:%S")
         date_para = Paragraph(f"Generated on: {date_str}", styles['Normal'])
         story.append(date_para)
         story.append(Spacer(1, 12))
         
-        if report_type == "transactions" and data:
+        if report_type == "transactions" and len(data):
             # Create table
             df = pd.DataFrame(data)
             if not df.empty:
@@ -107,32 +223,18 @@ class ReportGenerator:
                 available_columns = [col for col in columns if col in df.columns]
                 
                 if available_columns:
-                    table_data = [available_columns]  # Headers
+                    # Format whole columns at once instead of cell by cell
+                    table_df = df[available_columns].copy()
+                    if 'date' in table_df.columns:
+                        table_df['date'] = ReportGenerator._iso_text(table_df['date'], 'D')
+                    if 'amount' in table_df.columns:
+                        table_df['amount'] = table_df['amount'].map('${:,.2f}'.format)
+                    table_df = table_df.fillna('-').astype(str)
                     
-                    for _, row in df.iterrows():
-                        row_data = []
-                        for col in available_columns:
-                            value = row[col]
-                            if col == 'date' and pd.notna(value):
-                                value = pd.to_datetime(value).strftime('%Y-%m-%d')
-                            elif col == 'amount':
-                                value = f"${value:,.2f}"
-                            elif pd.isna(value):
-                                value = "-"
-                            row_data.append(str(value))
-                        table_data.append(row_data)
+                    table_data = [available_columns] + table_df.values.tolist()  # Headers first
                     
-                    table = Table(table_data)
-                    table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, 0), 12),
-                        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                    ]))
+                    table = LongTable(table_data, repeatRows=1)
+                    table.setStyle(ReportGenerator.TABLE_STYLE)
                     
                     story.append(table)
         
@@ -142,138 +244,127 @@ class ReportGenerator:
         return output, filename
     
     @staticmethod
-    def generate_chart_base64(data, chart_type="pie", title="Chart"):
-        """Generate chart as base64 encoded string."""
-        plt.figure(figsize=(10, 6))
+    def render_chart_png(data, chart_type="pie", title="Chart"):
+        """Render a chart to PNG bytes."""
+        # An explicit Figure keeps no pyplot global state, so charts can be
+        # rendered from background threads as well as request threads
+        figure = Figure(figsize=(10, 6))
+        FigureCanvasAgg(figure)
+        axes = figure.subplots()
         
         if chart_type == "pie" and data:
             labels = [item['category'] for item in data]
             sizes = [item['amount'] for item in data]
             
-            plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
-            plt.title(title)
+            axes.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
+            axes.set_title(title)
             
         elif chart_type == "bar" and data:
             categories = [item['category'] for item in data]
             amounts = [item['amount'] for item in data]
             
-            plt.bar(categories, amounts)
-            plt.title(title)
-            plt.xticks(rotation=45)
-            plt.ylabel('Amount')
+            axes.bar(categories, amounts)
+            axes.set_title(title)
+            axes.tick_params(axis='x', labelrotation=45)
+            axes.set_ylabel('Amount')
             
         elif chart_type == "line" and data:
             dates = [item['date'] for item in data]
             amounts = [item['amount'] for item in data]
             
-            plt.plot(dates, amounts, marker='o')
-            plt.title(title)
-            plt.xticks(rotation=45)
-            plt.ylabel('Amount')
+            axes.plot(dates, amounts, marker='o')
+            axes.set_title(title)
+            axes.tick_params(axis='x', labelrotation=45)
+            axes.set_ylabel('Amount')
         
-        plt.tight_layout()
+        figure.tight_layout()
         
-        # Convert to base64
         buffer = BytesIO()
-        plt.savefig(buffer, format='png')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
+        figure.savefig(buffer, format='png')
+        return buffer.getvalue()
+    
+    @staticmethod
+    def generate_chart_base64(data, chart_type="pie", title="Chart"):
+        """Generate chart as base64 encoded string."""
+        image_base64 = base64.b64encode(ReportGenerator.render_chart_png(data, chart_type, title)).decode()
         return f"data:image/png;base64,{image_base64}"
     
+    TRANSACTION_COLUMNS = ['date', 'category_name', 'type', 'amount', 'note']
+    
     @staticmethod
-    def generate_transactions_csv(transactions, user_id):
-        """Generate CSV file for transactions."""
-        import tempfile
-        import os
-        
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"transactions_{user_id}_{timestamp}.csv"
-        file_path = os.path.join(temp_dir, filename)
-        
-        # Prepare data
-        df = pd.DataFrame(transactions)
-        if not df.empty:
-            # Format date column
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
-            
-            # Remove internal fields
-            columns_to_remove = ['_id', 'user_id']
-            df = df.drop(columns=[col for col in columns_to_remove if col in df.columns])
-            
-            # Reorder columns
-            column_order = ['date', 'category_name', 'type', 'amount', 'note']
-            df = df.reindex(columns=[col for col in column_order if col in df.columns])
-        
-        # Save to file
-        df.to_csv(file_path, index=False)
-        return file_path
+    def _transaction_row(transaction):
+        """Flatten a transaction into the user export columns."""
+        date = transaction.get('date')
+        if isinstance(date, datetime):
+            date = date.date().isoformat()
+        return [
+            date or '',
+            transaction.get('category_name', ''),
+            transaction.get('type', ''),
+            transaction.get('amount', 0),
+            transaction.get('note') or ''
+        ]
+    
+    @staticmethod
+    def _csv_chunks(header, rows):
+        """Yield CSV text for header and rows in ~64KB chunks, consuming rows lazily."""
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        
+        writer.writerow(header)
+        # writerows serializes a whole batch in C; batches stay small enough
+        # that the cursor is still consumed lazily
+        rows = iter(rows)
+        for batch in iter(lambda: list(islice(rows, 500)), []):
+            writer.writerows(batch)
+            # Flush in chunks so memory stays flat regardless of export size
+            if buffer.tell() >= 65536:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        
+        if buffer.tell():
+            yield buffer.getvalue()
     
     @staticmethod
-    def generate_transactions_excel(transactions, user_id):
-        """Generate Excel file for transactions."""
-        import tempfile
-        import os
+    def generate_transactions_csv(transactions):
+        """Yield CSV chunks for transactions; consumes any iterable lazily."""
+        rows = map(ReportGenerator._transaction_row, transactions)
+        return ReportGenerator._csv_chunks(ReportGenerator.TRANSACTION_COLUMNS, rows)
+    
+    @staticmethod
+    def generate_transactions_excel(transactions):
+        """Generate Excel file for transactions using a write-only workbook."""
+        output = BytesIO()
         
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"transactions_{user_id}_{timestamp}.xlsx"
-        file_path = os.path.join(temp_dir, filename)
+        # Write-only mode streams rows to the sheet instead of keeping a cell graph
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('Transactions')
+        for column_letter, width in zip('ABCDE', (12, 24, 10, 14, 40)):
+            worksheet.column_dimensions[column_letter].width = width
         
-        # Prepare data
-        df = pd.DataFrame(transactions)
-        if not df.empty:
-            # Format date column
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
-            
-            # Remove internal fields
-            columns_to_remove = ['_id', 'user_id']
-            df = df.drop(columns=[col for col in columns_to_remove if col in df.columns])
-            
-            # Reorder columns
-            column_order = ['date', 'category_name', 'type', 'amount', 'note']
-            df = df.reindex(columns=[col for col in column_order if col in df.columns])
+        worksheet.append(ReportGenerator.TRANSACTION_COLUMNS)
+        for transaction in transactions:
+            worksheet.append(ReportGenerator._transaction_row(transaction))
         
-        # Save to file
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Transactions', index=False)
-            
-            # Auto-adjust column widths
-            worksheet = writer.sheets['Transactions']
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        return file_path
+        ReportGenerator._save_workbook(workbook, output)
+        return output
+    
+    # Share of the page width for each column of the transaction listings.
+    # Fixed widths spare ReportLab measuring every cell to size the columns.
+    TRANSACTION_COL_SHARES = (0.13, 0.21, 0.11, 0.15, 0.40)
+    
+    @staticmethod
+    def _col_widths(doc, shares):
+        """Column widths in points splitting the document frame by shares."""
+        return [doc.width * share for share in shares]
     
     @staticmethod
-    def generate_transactions_pdf(transactions, user_id):
+    def generate_transactions_pdf(transactions):
         """Generate PDF file for transactions."""
-        import tempfile
-        import os
-        
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"transactions_{user_id}_{timestamp}.pdf"
-        file_path = os.path.join(temp_dir, filename)
-        
-        doc = SimpleDocTemplate(file_path, pagesize=letter)
-        styles = getSampleStyleSheet()
+        output = BytesIO()
+        doc = SimpleDocTemplate(output, pagesize=letter)
+        styles = ReportGenerator.PDF_STYLES
         story = []
         
         # Title
@@ -287,149 +378,206 @@ class ReportGenerator:
         story.append(date_para)
         story.append(Spacer(1, 12))
         
-        if transactions:
+        # Build the table and the totals in a single pass over the rows
+        table_data = [['Date', 'Category', 'Type', 'Amount', 'Note']]  # Headers
+        totals = {'income': 0, 'expense': 0}
+        
+        for transaction in transactions:
+            date, category_name, trans_type, amount, note = ReportGenerator._transaction_row(transaction)
+            if trans_type in totals:
+                totals[trans_type] += amount
+            
+            table_data.append([
+                str(date),
+                str(category_name),
+                str(trans_type).title(),
+                f"${amount:,.2f}",
+                str(note or '-')
+            ])
+        
+        count = len(table_data) - 1
+        if count:
             # Summary
-            total_income = sum(t['amount'] for t in transactions if t['type'] == 'income')
-            total_expense = sum(t['amount'] for t in transactions if t['type'] == 'expense')
-            balance = total_income - total_expense
-            
-            summary_para = Paragraph(f"Summary: {len(transactions)} transactions | Income: ${total_income:,.2f} | Expense: ${total_expense:,.2f} | Balance: ${balance:,.2f}", styles['Normal'])
+            balance = totals['income'] - totals['expense']
+            summary_para = Paragraph(f"Summary: {count} transactions | Income: ${totals['income']:,.2f} | Expense: ${totals['expense']:,.2f} | Balance: ${balance:,.2f}", styles['Normal'])
             story.append(summary_para)
             story.append(Spacer(1, 12))
             
-            # Create table
-            table_data = [['Date', 'Category', 'Type', 'Amount', 'Note']]  # Headers
-            
-            for transaction in transactions:
-                date_str = transaction.get('date', '')
-                if isinstance(date_str, str):
-                    try:
-                        date_str = datetime.fromisoformat(date_str.replace('Z', '+00:00')).strftime('%Y-%m-%d')
-                    except:
-                        pass
-                
-                row_data = [
-                    str(date_str),
-                    str(transaction.get('category_name', '')),
-                    str(transaction.get('type', '')).title(),
-                    f"${transaction.get('amount', 0):,.2f}",
-                    str(transaction.get('note', '') or '-')
-                ]
-                table_data.append(row_data)
-            
-            table = Table(table_data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ]))
+            table = LongTable(table_data, repeatRows=1, colWidths=ReportGenerator._col_widths(doc, ReportGenerator.TRANSACTION_COL_SHARES))
+            table.setStyle(ReportGenerator.COMPACT_TABLE_STYLE)
             
             story.append(table)
         else:
             story.append(Paragraph("No transactions found.", styles['Normal']))
         
         doc.build(story)
-        return file_path
+        output.seek(0)
+        return output
+    
+    ADMIN_TRANSACTION_HEADERS = ['Date', 'Username', 'Email', 'Category', 'Type', 'Amount', 'Note']
+    ADMIN_TRANSACTION_COL_SHARES = (0.12, 0.13, 0.21, 0.14, 0.09, 0.13, 0.18)
+    
+    @staticmethod
+    def _admin_transaction_row(transaction):
+        """Flatten an admin transaction (with optional user_info) into export columns."""
+        user_info = transaction.get('user_info') or {}
+        date = transaction.get('date')
+        if isinstance(date, datetime):
+            date = date.date().isoformat()
+        return [
+            date or '',
+            user_info.get('username', 'Unknown'),
+            user_info.get('email', 'Unknown'),
+            transaction.get('category_name', ''),
+            str(transaction.get('type', '')).title(),
+            transaction.get('amount', 0),
+            transaction.get('note') or ''
+        ]
+    
+    @staticmethod
+    def _admin_transaction_pdf_row(transaction):
+        """Admin export columns as the text cells of a PDF table row."""
+        row = ReportGenerator._admin_transaction_row(transaction)
+        row[5] = f"${row[5]:,.2f}"
+        row[6] = row[6] or '-'
+        return [str(value) for value in row]
+    
+    @staticmethod
+    def generate_admin_transactions_csv(transactions):
+        """Yield CSV chunks for admin transactions; consumes any iterable lazily."""
+        rows = map(ReportGenerator._admin_transaction_row, transactions)
+        return ReportGenerator._csv_chunks(ReportGenerator.ADMIN_TRANSACTION_HEADERS, rows)
+    
+    @staticmethod
+    def generate_admin_transactions_excel(transactions):
+        """Generate Excel file for admin transactions using a write-only workbook."""
+        output = BytesIO()
+        
+        # Write-only mode streams rows to the sheet instead of keeping a cell graph
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('Transactions')
+        worksheet.append(ReportGenerator.ADMIN_TRANSACTION_HEADERS)
+        for transaction in transactions:
+            worksheet.append(ReportGenerator._admin_transaction_row(transaction))
+        
+        ReportGenerator._save_workbook(workbook, output)
+        return output
+    
+    @staticmethod
+    def generate_admin_transactions_pdf(transactions):
+        """Generate PDF file for admin transactions."""
+        output = BytesIO()
+        doc = SimpleDocTemplate(output, pagesize=letter)
+        styles = ReportGenerator.PDF_STYLES
+        story = []
+        
+        # Title
+        story.append(Paragraph("Admin Transaction Report", styles['Title']))
+        story.append(Spacer(1, 12))
+        
+        # Date
+        date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        story.append(Paragraph(f"Generated on: {date_str}", styles['Normal']))
+        story.append(Spacer(1, 12))
+        
+        table_data = [ReportGenerator.ADMIN_TRANSACTION_HEADERS]
+        table_data.extend(map(ReportGenerator._admin_transaction_pdf_row, transactions))
+        
+        if len(table_data) > 1:
+            table = LongTable(table_data, repeatRows=1, colWidths=ReportGenerator._col_widths(doc, ReportGenerator.ADMIN_TRANSACTION_COL_SHARES))
+            table.setStyle(ReportGenerator.COMPACT_TABLE_STYLE)
+            story.append(table)
+        else:
+            story.append(Paragraph("No transactions found.", styles['Normal']))
+        
+        doc.build(story)
+        output.seek(0)
+        return output
     
     @staticmethod
     def generate_admin_csv_report(report_data):
         """Generate comprehensive CSV report for admin dashboard."""
-        import tempfile
-        import os
-        
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"admin_report_{timestamp}.csv"
-        file_path = os.path.join(temp_dir, filename)
         
         output = BytesIO()
         
-        # Create CSV content
-        csv_content = []
+        # Rows are encoded straight into output; the writer quotes any field
+        # with a comma, so notes and formatted amounts keep their commas
+        text = TextIOWrapper(output, encoding='utf-8', newline='', write_through=True)
+        writer = csv.writer(text, lineterminator='\n')
         
         # System Overview
-        csv_content.append("SYSTEM OVERVIEW")
-        csv_content.append("================")
+        writer.writerow(["SYSTEM OVERVIEW"])
+        writer.writerow(["================"])
         system_stats = report_data.get('system_stats', {})
-        csv_content.append(f"Total Users,{system_stats.get('total_users', 0)}")
-        csv_content.append(f"Active Users,{system_stats.get('active_users', 0)}")
-        csv_content.append(f"Total Transactions,{system_stats.get('transaction_count', 0)}")
-        csv_content.append(f"Total Income,${system_stats.get('total_income', 0):,.2f}")
-        csv_content.append(f"Total Expense,${system_stats.get('total_expense', 0):,.2f}")
-        csv_content.append(f"Net Balance,${(system_stats.get('total_income', 0) - system_stats.get('total_expense', 0)):,.2f}")
-        csv_content.append("")
+        total_income = system_stats.get('total_income', 0)
+        total_expense = system_stats.get('total_expense', 0)
+        writer.writerows([
+            ["Total Users", system_stats.get('total_users', 0)],
+            ["Active Users", system_stats.get('active_users', 0)],
+            ["Total Transactions", system_stats.get('transaction_count', 0)],
+            ["Total Income", f"${total_income:,.2f}"],
+            ["Total Expense", f"${total_expense:,.2f}"],
+            ["Net Balance", f"${total_income - total_expense:,.2f}"],
+            []
+        ])
         
         # Category Breakdown
         if 'categories' in report_data and report_data['categories']:
-            csv_content.append("CATEGORY BREAKDOWN")
-            csv_content.append("==================")
-            csv_content.append("Category,Total Amount,Transaction Count,Percentage")
+            writer.writerow(["CATEGORY BREAKDOWN"])
+            writer.writerow(["=================="])
+            writer.writerow(["Category", "Total Amount", "Transaction Count", "Percentage"])
             
-            total_expense = sum(cat['total'] for cat in report_data['categories'])
-            for category in report_data['categories']:
-                percentage = (category['total'] / total_expense * 100) if total_expense > 0 else 0
-                csv_content.append(f"{category['_id']},${category['total']:,.2f},{category['count']},{percentage:.1f}%")
-            csv_content.append("")
+            writer.writerows(
+                [category['_id'], f"${category['total']:,.2f}", category['count'], f"{category['percentage']:.1f}%"]
+                for category in report_data['categories']
+            )
+            writer.writerow([])
         
         # Monthly Trends
         if 'monthly_data' in report_data and report_data['monthly_data']:
-            csv_content.append("MONTHLY TRENDS")
-            csv_content.append("==============")
-            csv_content.append("Year,Month,Type,Amount")
+            writer.writerow(["MONTHLY TRENDS"])
+            writer.writerow(["=============="])
+            writer.writerow(["Month", "Type", "Amount"])
             
-            for month_data in report_data['monthly_data']:
-                year = month_data['_id']['year']
-                month = month_data['_id']['month']
-                trans_type = month_data['_id']['type']
-                amount = month_data['total']
-                csv_content.append(f"{year},{month:02d},{trans_type.title()},${amount:,.2f}")
-            csv_content.append("")
+            writer.writerows(
+                [month_data['period'], month_data['type'].title(), f"${month_data['total']:,.2f}"]
+                for month_data in report_data['monthly_data']
+            )
+            writer.writerow([])
         
         # User Activities
         if 'user_activities' in report_data and report_data['user_activities']:
-            csv_content.append("TOP USER ACTIVITIES")
-            csv_content.append("===================")
-            csv_content.append("Username,Email,Total Income,Total Expense,Net Balance,Transaction Count")
+            writer.writerow(["TOP USER ACTIVITIES"])
+            writer.writerow(["==================="])
+            writer.writerow(["Username", "Email", "Total Income", "Total Expense", "Net Balance", "Transaction Count"])
             
             for activity in report_data['user_activities']:
                 user_info = activity.get('user_info', {})
-                username = user_info.get('username', 'Unknown')
-                email = user_info.get('email', 'Unknown')
-                income = activity.get('total_income', 0)
-                expense = activity.get('total_expense', 0)
-                balance = activity.get('net_balance', 0)
-                count = activity.get('transaction_count', 0)
-                csv_content.append(f"{username},{email},${income:,.2f},${expense:,.2f},${balance:,.2f},{count}")
-            csv_content.append("")
+                writer.writerow([
+                    user_info.get('username', 'Unknown'),
+                    user_info.get('email', 'Unknown'),
+                    f"${activity.get('total_income', 0):,.2f}",
+                    f"${activity.get('total_expense', 0):,.2f}",
+                    f"${activity.get('net_balance', 0):,.2f}",
+                    activity.get('transaction_count', 0)
+                ])
+            writer.writerow([])
         
         # Transaction Details
         if 'transactions' in report_data and report_data['transactions']:
-            csv_content.append("TRANSACTION DETAILS")
-            csv_content.append("===================")
-            csv_content.append("Date,Username,Email,Category,Type,Amount,Note")
+            writer.writerow(["TRANSACTION DETAILS"])
+            writer.writerow(["==================="])
+            writer.writerow(ReportGenerator.ADMIN_TRANSACTION_HEADERS)
             
             for transaction in report_data['transactions'][:100]:  # Limit to first 100
-                user_info = transaction.get('user_info', {})
-                username = user_info.get('username', 'Unknown')
-                email = user_info.get('email', 'Unknown')
-                date = transaction.get('date', '')
-                category = transaction.get('category_name', '')
-                trans_type = transaction.get('type', '')
-                amount = transaction.get('amount', 0)
-                note = transaction.get('note', '').replace(',', ';')  # Replace commas to avoid CSV issues
-                
-                csv_content.append(f"{date},{username},{email},{category},{trans_type.title()},${amount:,.2f},{note}")
+                row = ReportGenerator._admin_transaction_row(transaction)
+                row[5] = f"${row[5]:,.2f}"
+                writer.writerow(row)
         
-        # Write to BytesIO
-        csv_data = "\n".join(csv_content)
-        output.write(csv_data.encode('utf-8'))
+        # Hand output back without letting the wrapper close it
+        text.detach()
         output.seek(0)
         
         return output, filename
@@ -437,224 +585,189 @@ class ReportGenerator:
     @staticmethod
     def generate_admin_excel_report(report_data):
         """Generate comprehensive Excel report for admin dashboard."""
-        import tempfile
-        import os
-        
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"admin_report_{timestamp}.xlsx"
-        file_path = os.path.join(temp_dir, filename)
         
         output = BytesIO()
         
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # System Overview Sheet
-            system_stats = report_data.get('system_stats', {})
-            overview_data = {
-                'Metric': ['Total Users', 'Active Users', 'Total Transactions', 'Total Income', 'Total Expense', 'Net Balance'],
-                'Value': [
-                    system_stats.get('total_users', 0),
-                    system_stats.get('active_users', 0),
-                    system_stats.get('transaction_count', 0),
-                    f"${system_stats.get('total_income', 0):,.2f}",
-                    f"${system_stats.get('total_expense', 0):,.2f}",
-                    f"${(system_stats.get('total_income', 0) - system_stats.get('total_expense', 0)):,.2f}"
+        # Write-only mode streams rows to each sheet instead of keeping a cell graph
+        workbook = Workbook(write_only=True)
+        
+        # System Overview Sheet
+        system_stats = report_data.get('system_stats', {})
+        total_income = system_stats.get('total_income', 0)
+        total_expense = system_stats.get('total_expense', 0)
+        ReportGenerator._append_sheet(workbook, 'System Overview', ['Metric', 'Value'], [
+            ['Total Users', system_stats.get('total_users', 0)],
+            ['Active Users', system_stats.get('active_users', 0)],
+            ['Total Transactions', system_stats.get('transaction_count', 0)],
+            ['Total Income', f"${total_income:,.2f}"],
+            ['Total Expense', f"${total_expense:,.2f}"],
+            ['Net Balance', f"${total_income - total_expense:,.2f}"]
+        ])
+        
+        # Category Breakdown Sheet
+        if 'categories' in report_data and report_data['categories']:
+            ReportGenerator._append_sheet(
+                workbook, 'Category Breakdown',
+                ['Category', 'Total Amount', 'Transaction Count', 'Percentage'],
+                ([
+                    category['_id'],
+                    category['total'],
+                    category['count'],
+                    f"{category['percentage']:.1f}%"
+                ] for category in report_data['categories'])
+            )
+        
+        # Monthly Trends Sheet
+        if 'monthly_data' in report_data and report_data['monthly_data']:
+            ReportGenerator._append_sheet(
+                workbook, 'Monthly Trends',
+                ['Month', 'Type', 'Amount'],
+                ([month_data['period'], month_data['type'].title(), month_data['total']]
+                 for month_data in report_data['monthly_data'])
+            )
+        
+        # User Activities Sheet
+        if 'user_activities' in report_data and report_data['user_activities']:
+            def activity_row(activity):
+                user_info = activity.get('user_info', {})
+                return [
+                    user_info.get('username', 'Unknown'),
+                    user_info.get('email', 'Unknown'),
+                    activity.get('total_income', 0),
+                    activity.get('total_expense', 0),
+                    activity.get('net_balance', 0),
+                    activity.get('transaction_count', 0)
                 ]
-            }
-            df_overview = pd.DataFrame(overview_data)
-            df_overview.to_excel(writer, sheet_name='System Overview', index=False)
             
-            # Category Breakdown Sheet
-            if 'categories' in report_data and report_data['categories']:
-                categories_data = []
-                total_expense = sum(cat['total'] for cat in report_data['categories'])
-                
-                for category in report_data['categories']:
-                    percentage = (category['total'] / total_expense * 100) if total_expense > 0 else 0
-                    categories_data.append({
-                        'Category': category['_id'],
-                        'Total Amount': category['total'],
-                        'Transaction Count': category['count'],
-                        'Percentage': f"{percentage:.1f}%"
-                    })
-                
-                df_categories = pd.DataFrame(categories_data)
-                df_categories.to_excel(writer, sheet_name='Category Breakdown', index=False)
-            
-            # Monthly Trends Sheet
-            if 'monthly_data' in report_data and report_data['monthly_data']:
-                monthly_data = []
-                for month_data in report_data['monthly_data']:
-                    monthly_data.append({
-                        'Year': month_data['_id']['year'],
-                        'Month': month_data['_id']['month'],
-                        'Type': month_data['_id']['type'].title(),
-                        'Amount': month_data['total']
-                    })
-                
-                df_monthly = pd.DataFrame(monthly_data)
-                df_monthly.to_excel(writer, sheet_name='Monthly Trends', index=False)
-            
-            # User Activities Sheet
-            if 'user_activities' in report_data and report_data['user_activities']:
-                activities_data = []
-                for activity in report_data['user_activities']:
-                    user_info = activity.get('user_info', {})
-                    activities_data.append({
-                        'Username': user_info.get('username', 'Unknown'),
-                        'Email': user_info.get('email', 'Unknown'),
-                        'Total Income': activity.get('total_income', 0),
-                        'Total Expense': activity.get('total_expense', 0),
-                        'Net Balance': activity.get('net_balance', 0),
-                        'Transaction Count': activity.get('transaction_count', 0)
-                    })
-                
-                df_activities = pd.DataFrame(activities_data)
-                df_activities.to_excel(writer, sheet_name='User Activities', index=False)
+            ReportGenerator._append_sheet(
+                workbook, 'User Activities',
+                ['Username', 'Email', 'Total Income', 'Total Expense', 'Net Balance', 'Transaction Count'],
+                map(activity_row, report_data['user_activities'])
+            )
+        
+        # Transaction Details Sheet (limited to 1000 records)
+        if 'transactions' in report_data and report_data['transactions']:
+            def transaction_row(transaction):
+                user_info = transaction.get('user_info', {})
+                return [
+                    transaction.get('date', ''),
+                    user_info.get('username', 'Unknown'),
+                    user_info.get('email', 'Unknown'),
+                    transaction.get('category_name', ''),
+                    transaction.get('type', '').title(),
+                    transaction.get('amount', 0),
+                    transaction.get('note', '')
+                ]
             
-            # Transaction Details Sheet (limited to 1000 records)
-            if 'transactions' in report_data and report_data['transactions']:
-                transactions_data = []
-                for transaction in report_data['transactions'][:1000]:
-                    user_info = transaction.get('user_info', {})
-                    transactions_data.append({
-                        'Date': transaction.get('date', ''),
-                        'Username': user_info.get('username', 'Unknown'),
-                        'Email': user_info.get('email', 'Unknown'),
-                        'Category': transaction.get('category_name', ''),
-                        'Type': transaction.get('type', '').title(),
-                        'Amount': transaction.get('amount', 0),
-                        'Note': transaction.get('note', '')
-                    })
-                
-                df_transactions = pd.DataFrame(transactions_data)
-                df_transactions.to_excel(writer, sheet_name='Transaction Details', index=False)
+            ReportGenerator._append_sheet(
+                workbook, 'Transaction Details',
+                ReportGenerator.ADMIN_TRANSACTION_HEADERS,
+                map(transaction_row, report_data['transactions'][:1000])
+            )
         
-        output.seek(0)
+        ReportGenerator._save_workbook(workbook, output)
         return output, filename
     
+    @staticmethod
+    def _pdf_section(heading, table):
+        """Story flowables for a titled table section."""
+        return [
+            Paragraph(heading, ReportGenerator.PDF_STYLES['Heading1']),
+            Spacer(1, 12),
+            table,
+            Spacer(1, 20)
+        ]
+    
     @staticmethod
     def generate_admin_pdf_report(report_data):
         """Generate comprehensive PDF report for admin dashboard."""
-        import tempfile
-        import os
-        
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        generated_at = datetime.now()
+        timestamp = generated_at.strftime("%Y%m%d_%H%M%S")
         filename = f"admin_report_{timestamp}.pdf"
-        file_path = os.path.join(temp_dir, filename)
         
         output = BytesIO()
         doc = SimpleDocTemplate(output, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Title
-        title = Paragraph("Admin System Report", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
-        
-        # Date
-        date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        date_para = Paragraph(f"Generated on: {date_str}", styles['Normal'])
-        story.append(date_para)
-        story.append(Spacer(1, 20))
+        styles = ReportGenerator.PDF_STYLES
+        
+        # Title and date
+        date_str = generated_at.strftime("%Y-%m-%d %H:%M:%S")
+        story = [
+            Paragraph("Admin System Report", styles['Title']),
+            Spacer(1, 12),
+            Paragraph(f"Generated on: {date_str}", styles['Normal']),
+            Spacer(1, 20)
+        ]
         
         # System Overview
         system_stats = report_data.get('system_stats', {})
-        overview_title = Paragraph("System Overview", styles['Heading1'])
-        story.append(overview_title)
-        story.append(Spacer(1, 12))
-        
-        overview_data = [
+        total_income = system_stats.get('total_income', 0)
+        total_expense = system_stats.get('total_expense', 0)
+        overview_table = Table([
             ['Metric', 'Value'],
             ['Total Users', str(system_stats.get('total_users', 0))],
             ['Active Users', str(system_stats.get('active_users', 0))],
             ['Total Transactions', str(system_stats.get('transaction_count', 0))],
-            ['Total Income', f"${system_stats.get('total_income', 0):,.2f}"],
-            ['Total Expense', f"${system_stats.get('total_expense', 0):,.2f}"],
-            ['Net Balance', f"${(system_stats.get('total_income', 0) - system_stats.get('total_expense', 0)):,.2f}"]
-        ]
-        
-        overview_table = Table(overview_data)
-        overview_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(overview_table)
-        story.append(Spacer(1, 20))
+            ['Total Income', f"${total_income:,.2f}"],
+            ['Total Expense', f"${total_expense:,.2f}"],
+            ['Net Balance', f"${total_income - total_expense:,.2f}"]
+        ])
+        overview_table.setStyle(ReportGenerator.TABLE_STYLE)
+        story += ReportGenerator._pdf_section("System Overview", overview_table)
         
         # Top Categories
         if 'categories' in report_data and report_data['categories']:
-            categories_title = Paragraph("Top Categories by Expense", styles['Heading1'])
-            story.append(categories_title)
-            story.append(Spacer(1, 12))
-            
-            categories_data = [['Category', 'Amount', 'Count', 'Percentage']]
-            total_expense = sum(cat['total'] for cat in report_data['categories'])
-            
-            for category in report_data['categories'][:10]:  # Top 10
-                percentage = (category['total'] / total_expense * 100) if total_expense > 0 else 0
-                categories_data.append([
+            categories_table = Table([['Category', 'Amount', 'Count', 'Percentage']] + [
+                [
                     category['_id'],
                     f"${category['total']:,.2f}",
                     str(category['count']),
-                    f"{percentage:.1f}%"
-                ])
-            
-            categories_table = Table(categories_data)
-            categories_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ]))
-            
-            story.append(categories_table)
-            story.append(Spacer(1, 20))
+                    f"{category['percentage']:.1f}%"
+                ]
+                for category in report_data['categories'][:10]  # Top 10
+            ])
+            categories_table.setStyle(ReportGenerator.COMPACT_TABLE_STYLE)
+            story += ReportGenerator._pdf_section("Top Categories by Expense", categories_table)
+        
+        # Monthly Trends
+        if 'monthly_data' in report_data and report_data['monthly_data']:
+            monthly_table = Table([['Month', 'Type', 'Amount']] + [
+                [month_data['period'], month_data['type'].title(), f"${month_data['total']:,.2f}"]
+                for month_data in report_data['monthly_data']
+            ], repeatRows=1)
+            monthly_table.setStyle(ReportGenerator.COMPACT_TABLE_STYLE)
+            story += ReportGenerator._pdf_section("Monthly Trends", monthly_table)
         
         # Top Users
         if 'user_activities' in report_data and report_data['user_activities']:
-            users_title = Paragraph("Top Active Users", styles['Heading1'])
-            story.append(users_title)
-            story.append(Spacer(1, 12))
-            
-            users_data = [['Username', 'Total Expense', 'Transaction Count', 'Net Balance']]
-            
-            for activity in report_data['user_activities'][:10]:  # Top 10
-                user_info = activity.get('user_info', {})
-                users_data.append([
-                    user_info.get('username', 'Unknown'),
+            users_table = Table([['Username', 'Total Expense', 'Transaction Count', 'Net Balance']] + [
+                [
+                    activity.get('user_info', {}).get('username', 'Unknown'),
                     f"${activity.get('total_expense', 0):,.2f}",
                     str(activity.get('transaction_count', 0)),
                     f"${activity.get('net_balance', 0):,.2f}"
-                ])
-            
-            users_table = Table(users_data)
-            users_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ]))
-            
-            story.append(users_table)
+                ]
+                for activity in report_data['user_activities'][:10]  # Top 10
+            ])
+            users_table.setStyle(ReportGenerator.COMPACT_TABLE_STYLE)
+            story += ReportGenerator._pdf_section("Top Active Users", users_table)
+        
+        # Transaction Details (limited to the first 100, like the CSV report)
+        if 'transactions' in report_data and report_data['transactions']:
+            transactions_data = [ReportGenerator.ADMIN_TRANSACTION_HEADERS] + [
+                ReportGenerator._admin_transaction_pdf_row(transaction)
+                for transaction in report_data['transactions'][:100]
+            ]
+            transactions_table = LongTable(
+                transactions_data,
+                repeatRows=1,
+                colWidths=ReportGenerator._col_widths(doc, ReportGenerator.ADMIN_TRANSACTION_COL_SHARES)
+            )
+            transactions_table.setStyle(ReportGenerator.COMPACT_TABLE_STYLE)
+            story += ReportGenerator._pdf_section("Transaction Details", transactions_table)
+        
+        doc.build(story)
+        output.seek(0)
+        
+        return output, filename
@@ -0,0 +1,131 @@
+import queue
+import smtplib
+
+class SMTPPool:
+    """Reuses authenticated Flask-Mail connections instead of reconnecting per email.
+
+    Opening a connection costs a TCP connect, the TLS handshake and AUTH,
+    which dominates the time to send a single message. Idle connections
+    are kept in a queue, checked with NOOP on checkout and recycled after
+    max_messages sends. Must be used inside an app context.
+    """
+
+    def __init__(self, mail, size=5, max_messages=100):
+        self.mail = mail
+        self.max_messages = max_messages
+        self._idle = queue.Queue(maxsize=size)
+
+    def _open(self):
+        """Open and authenticate a new connection."""
+        connection = self.mail.connect()
+        connection.__enter__()
+        connection.pool_sent = 0
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        """Quit a connection, ignoring a server that has already gone away."""
+        try:
+            connection.__exit__(None, None, None)
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    def _checkout(self):
+        """An idle connection that still answers NOOP, or a new one."""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+
+            # Suppressed sends (testing) have no host to check
+            if connection.host is None:
+                return connection
+            try:
+                if connection.host.noop()[0] == 250:
+                    return connection
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close(connection)
+
+    def _checkin(self, connection):
+        """Keep the connection for reuse unless it is worn out or the pool is full."""
+        if connection.pool_sent >= self.max_messages:
+            self._close(connection)
+            return
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            self._close(connection)
+
+    def send(self, message):
+        """Send a Flask-Mail Message, reconnecting once if the server dropped the connection."""
+        connection = self._checkout()
+        try:
+            try:
+                connection.send(message)
+            except smtplib.SMTPServerDisconnected:
+                self._close(connection)
+                connection = self._open()
+                connection.send(message)
+        except Exception:
+            self._close(connection)
+            raise
+
+        connection.pool_sent += 1
+        self._checkin(connection)
+
+    def send_many(self, messages):
+        """Send messages over one checked-out connection and return each one's exception or None.
+
+        Skips the per-message checkout and NOOP of repeated send calls. A
+        failed message does not stop the batch; the connection is replaced
+        when the server drops it or it reaches max_messages. If no
+        connection can be opened, that error is returned for every message
+        not yet sent, keeping the results of those already delivered.
+        """
+        messages = list(messages)
+        errors = []
+        connection = None
+        for index, message in enumerate(messages):
+            try:
+                if connection is None:
+                    connection = self._checkout() if index == 0 else self._open()
+                elif connection.pool_sent >= self.max_messages:
+                    self._close(connection)
+                    connection = None
+                    connection = self._open()
+            except Exception as e:
+                # The server cannot be reached; don't wait on it once per message
+                errors.extend([e] * (len(messages) - index))
+                return errors
+
+            try:
+                try:
+                    connection.send(message)
+                except smtplib.SMTPServerDisconnected:
+                    self._close(connection)
+                    connection = None
+                    connection = self._open()
+                    connection.send(message)
+            except Exception as e:
+                # Only a broken connection is discarded; a rejected recipient leaves it usable
+                if not isinstance(e, smtplib.SMTPRecipientsRefused) and connection is not None:
+                    self._close(connection)
+                    connection = None
+                errors.append(e)
+                continue
+            connection.pool_sent += 1
+            errors.append(None)
+
+        if connection is not None:
+            self._checkin(connection)
+        return errors
+
+    def close(self):
+        """Quit every idle connection."""
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
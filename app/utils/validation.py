@@ -0,0 +1,8 @@
+from bson.objectid import ObjectId
+
+def to_object_id(value):
+    """Parse value as an ObjectId, or return None if it is not a valid id."""
+    # is_valid rejects bad input without raising, so invalid ids stay cheap
+    if not ObjectId.is_valid(value):
+        return None
+    return ObjectId(value)